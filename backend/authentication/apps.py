@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class AuthenticationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'authentication'
+
+    def ready(self):
+        import authentication.checks
@@ -2,6 +2,7 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils import timezone
 from .models import APIKey
+from .usage import record_api_key_use
 
 class APIKeyAuthentication(BaseAuthentication):
     """
@@ -29,10 +30,8 @@ class APIKeyAuthentication(BaseAuthentication):
                 if client_ip not in key_obj.allowed_ips:
                     raise AuthenticationFailed('IP address not allowed')
             
-            # Update usage stats
-            key_obj.last_used = timezone.now()
-            key_obj.usage_count += 1
-            key_obj.save(update_fields=['last_used', 'usage_count'])
+            # Buffered in the cache and flushed by flush_api_key_usage_task
+            record_api_key_use(key_obj.id)
             
             return (key_obj.user, key_obj)
             
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+from .usage import is_process_local, usage_cache
+
+@register('caches')
+def check_api_key_usage_cache(app_configs, **kwargs):
+    """API key usage is buffered in API_KEY_USAGE_CACHE and flushed by Celery beat"""
+    if not is_process_local(usage_cache()):
+        return []
+    message = (
+        f'API_KEY_USAGE_CACHE ({settings.API_KEY_USAGE_CACHE!r}) is local to each process, '
+        'so the Celery flush cannot see buffered API key usage.'
+    )
+    hint = 'Point it at a shared cache such as Redis with a no-eviction policy for keys without a TTL.'
+    if settings.DEBUG:
+        # Each process flushes its own counters, which is enough for development
+        return [Warning(message, hint=hint, id='authentication.W001')]
+    return [Error(message, hint=hint, id='authentication.E001')]
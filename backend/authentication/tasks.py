@@ -0,0 +1,13 @@
+from celery import shared_task
+import logging
+
+from .usage import flush_api_key_usage
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def flush_api_key_usage_task():
+    """Write buffered API key usage counts and last-used times to the database"""
+    flushed = flush_api_key_usage()
+    logger.info(f"Flushed {flushed} buffered API key uses")
+    return flushed
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+import threading
+import time
+
+from .models import APIKey
+
+API_KEY_USAGE_KEY = 'api-key-usage:{key_id}'
+API_KEY_LAST_USED_KEY = 'api-key-last-used:{key_id}'
+
+_flush_lock = threading.Lock()
+_last_local_flush = time.monotonic()
+
+def usage_cache():
+    return caches[settings.API_KEY_USAGE_CACHE]
+
+def is_process_local(cache):
+    """Whether other processes (the Celery beat flush) cannot see what this cache holds"""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+def record_api_key_use(key_id):
+    """
+    Count one authenticated request in the cache; flushed to APIKey by flush_api_key_usage().
+
+    With a process-local cache the Celery flush cannot see these counters,
+    so the process flushes its own every API_KEY_USAGE_FLUSH_SECONDS (the
+    authentication.E001 check reports that configuration).
+    """
+    cache = usage_cache()
+    key = API_KEY_USAGE_KEY.format(key_id=key_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+    cache.set(API_KEY_LAST_USED_KEY.format(key_id=key_id), timezone.now(), timeout=None)
+
+    if is_process_local(cache) and time.monotonic() - _last_local_flush >= settings.API_KEY_USAGE_FLUSH_SECONDS:
+        flush_api_key_usage()
+
+def pending_api_key_usage(key_ids):
+    """Unflushed {key_id: (count, last_used)} for the given keys"""
+    cache = usage_cache()
+    key_ids = list(key_ids)
+    counts = cache.get_many([API_KEY_USAGE_KEY.format(key_id=key_id) for key_id in key_ids])
+    last_used = cache.get_many([API_KEY_LAST_USED_KEY.format(key_id=key_id) for key_id in key_ids])
+    pending = {}
+    for key_id in key_ids:
+        count = counts.get(API_KEY_USAGE_KEY.format(key_id=key_id)) or 0
+        used = last_used.get(API_KEY_LAST_USED_KEY.format(key_id=key_id))
+        if count or used:
+            pending[key_id] = (count, used)
+    return pending
+
+def flush_api_key_usage():
+    """
+    Apply buffered usage to APIKey rows with a single UPDATE.
+
+    Counters are decremented by the amount flushed, after the UPDATE commits,
+    rather than deleted, so requests counted while the flush runs are kept
+    for the next one. One
+    flush runs at a time per process; returns 0 if one is already running.
+    """
+    global _last_local_flush
+    if not _flush_lock.acquire(blocking=False):
+        return 0
+    try:
+        _last_local_flush = time.monotonic()
+        return _flush(usage_cache())
+    finally:
+        _flush_lock.release()
+
+def _flush(cache):
+    pending = pending_api_key_usage(APIKey.objects.values_list('id', flat=True))
+    if not pending:
+        return 0
+
+    # Counters are only decremented once the UPDATE has committed, so a failed
+    # flush leaves them for the next one rather than losing them
+    with transaction.atomic():
+        APIKey.objects.filter(id__in=pending).update(
+            usage_count=F('usage_count') + Case(
+                *[When(id=key_id, then=Value(count)) for key_id, (count, _) in pending.items()],
+                default=Value(0), output_field=PositiveIntegerField()
+            ),
+            last_used=Case(
+                *[When(id=key_id, then=Value(used)) for key_id, (_, used) in pending.items() if used],
+                default=F('last_used'), output_field=DateTimeField()
+            ),
+        )
+
+    for key_id, (count, _) in pending.items():
+        if count:
+            try:
+                cache.decr(API_KEY_USAGE_KEY.format(key_id=key_id), count)
+            except ValueError:
+                # Evicted since it was read; nothing left to carry over
+                pass
+    cache.delete_many([API_KEY_LAST_USED_KEY.format(key_id=key_id) for key_id in pending])
+    return sum(count for count, _ in pending.values())
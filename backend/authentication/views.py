@@ -15,6 +15,7 @@ from .serializers import (
     APIKeySerializer, UserSessionSerializer
 )
 from .permissions import IsOwnerOrAdmin
+from .usage import pending_api_key_usage
 
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -217,7 +218,10 @@ def user_stats(request):
     # API key stats
     api_keys = APIKey.objects.filter(user=user)
     active_api_keys = api_keys.filter(is_active=True).count()
-    total_api_usage = sum(key.usage_count for key in api_keys)
+    usage = dict(api_keys.values_list('id', 'usage_count'))
+    # Flushed totals plus requests still buffered in the cache
+    pending = pending_api_key_usage(usage)
+    total_api_usage = sum(usage.values()) + sum(count for count, _ in pending.values())
     
     stats = {
         'user_info': {
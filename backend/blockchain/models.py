@@ -50,6 +50,9 @@ class BlockchainTransaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.batch_id} - {self.status}"
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from traceability.models import Batch, ProcessingEvent, QualityTest
+from traceability.changes import record_change
+from .models import BlockchainTransaction
 from .tasks import record_batch_on_blockchain, record_processing_on_blockchain, record_quality_test_on_blockchain
 
 @receiver(post_save, sender=Batch)
@@ -30,3 +32,12 @@ def quality_test_created_handler(sender, instance, created, **kwargs):
             args=[instance.id],
             countdown=5
         )
+
+@receiver(post_save, sender=BlockchainTransaction)
+def transaction_saved_handler(sender, instance, created, **kwargs):
+    """Log transaction writes for the change feed"""
+    record_change(instance, 'CREATE' if created else 'UPDATE')
+
+@receiver(post_delete, sender=BlockchainTransaction)
+def transaction_deleted_handler(sender, instance, **kwargs):
+    record_change(instance, 'DELETE')
@@ -6,6 +6,8 @@ import logging
 from .models import BlockchainTransaction
 from .services import blockchain_service
 from traceability.models import Batch, ProcessingEvent, QualityTest
+from traceability.cache import bump_batch_version
+from traceability.changes import record_changes
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +20,7 @@ def record_batch_on_blockchain(self, batch_id):
         
         if tx_hash:
             batch.blockchain_hash = tx_hash
-            batch.save(update_fields=['blockchain_hash'])
+            batch.save(update_fields=['blockchain_hash', 'updated_at'])
             logger.info(f"Batch {batch_id} recorded on blockchain: {tx_hash}")
         else:
             raise Exception("Failed to record batch on blockchain")
@@ -30,6 +32,41 @@ def record_batch_on_blockchain(self, batch_id):
         else:
             logger.error(f"Max retries reached for batch {batch_id}")
 
+@shared_task(bind=True, max_retries=3)
+def record_batches_on_blockchain(self, batch_ids):
+    """Async task to record a bulk upload of batches on blockchain as one job"""
+    batches = Batch.objects.filter(
+        batch_id__in=batch_ids, blockchain_hash=''
+    ).select_related('species', 'collector__user')
+    
+    recorded = []
+    failed = []
+    for batch in batches:
+        try:
+            tx_hash = blockchain_service.record_collection_event(batch)
+        except Exception as e:
+            logger.error(f"Error recording batch {batch.batch_id} on blockchain: {e}")
+            tx_hash = None
+        
+        if tx_hash:
+            batch.blockchain_hash = tx_hash
+            batch.updated_at = timezone.now()
+            recorded.append(batch)
+        else:
+            failed.append(batch.batch_id)
+    
+    if recorded:
+        Batch.objects.bulk_update(recorded, ['blockchain_hash', 'updated_at'])
+        record_changes('batch', [batch.batch_id for batch in recorded], 'UPDATE')
+        for batch in recorded:
+            bump_batch_version(batch.batch_id)
+        logger.info(f"Recorded {len(recorded)} batches on blockchain")
+    
+    if failed:
+        if self.request.retries < self.max_retries:
+            raise self.retry(args=[failed], countdown=60 * (2 ** self.request.retries))
+        logger.error(f"Max retries reached for batches {', '.join(failed)}")
+
 @shared_task(bind=True, max_retries=3)
 def record_processing_on_blockchain(self, processing_event_id):
     """Async task to record processing event on blockchain"""
@@ -39,7 +76,7 @@ def record_processing_on_blockchain(self, processing_event_id):
         
         if tx_hash:
             processing_event.blockchain_hash = tx_hash
-            processing_event.save(update_fields=['blockchain_hash'])
+            processing_event.save(update_fields=['blockchain_hash', 'updated_at'])
             logger.info(f"Processing event {processing_event_id} recorded on blockchain: {tx_hash}")
         else:
             raise Exception("Failed to record processing event on blockchain")
@@ -94,12 +131,23 @@ def update_transaction_statuses():
                     
                     # Update related model
                     if tx.transaction_type == 'COLLECTION':
-                        Batch.objects.filter(batch_id=tx.batch_id).update(is_blockchain_verified=True)
+                        if Batch.objects.filter(batch_id=tx.batch_id).update(
+                            is_blockchain_verified=True, updated_at=timezone.now()
+                        ):
+                            record_changes('batch', [tx.batch_id], 'UPDATE')
                     elif tx.transaction_type == 'PROCESSING':
-                        ProcessingEvent.objects.filter(
+                        events = ProcessingEvent.objects.filter(
                             batch__batch_id=tx.batch_id,
                             blockchain_hash=tx.transaction_hash
-                        ).update(is_blockchain_verified=True)
+                        )
+                        event_ids = list(events.values_list('id', flat=True))
+                        ProcessingEvent.objects.filter(id__in=event_ids).update(
+                            is_blockchain_verified=True, updated_at=timezone.now()
+                        )
+                        record_changes('processing_event', event_ids, 'UPDATE')
+                    
+                    # Queryset updates bypass post_save, so invalidate and log explicitly
+                    bump_batch_version(tx.batch_id)
                 
                 tx.save()
                 updated_count += 1
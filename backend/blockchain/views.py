@@ -9,10 +9,14 @@ from .serializers import BlockchainTransactionSerializer, SmartContractSerialize
 from .services import blockchain_service
 from .tasks import verify_batch_integrity_task
 from traceability.models import Batch
+from traceability.fastpath import FastListMixin
+from herbtrace.db_routers import ReplicaReadMixin, replica_reads
+from herbtrace.pagination import HybridPagination
 
-class BlockchainTransactionListView(generics.ListAPIView):
+class BlockchainTransactionListView(ReplicaReadMixin, FastListMixin, generics.ListAPIView):
     serializer_class = BlockchainTransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = HybridPagination
     
     def get_queryset(self):
         queryset = BlockchainTransaction.objects.all()
@@ -97,7 +101,8 @@ def verify_batch_integrity(request, batch_id):
 def blockchain_analytics(request):
     """Get blockchain analytics and statistics"""
     try:
-        analytics = blockchain_service.get_blockchain_analytics()
+        with replica_reads():
+            analytics = blockchain_service.get_blockchain_analytics()
         return Response(analytics)
         
     except Exception as e:
@@ -154,7 +159,7 @@ def force_blockchain_sync(request, batch_id):
         
         if tx_hash:
             batch.blockchain_hash = tx_hash
-            batch.save(update_fields=['blockchain_hash'])
+            batch.save(update_fields=['blockchain_hash', 'updated_at'])
             
             return Response({
                 'message': 'Batch recorded on blockchain successfully',
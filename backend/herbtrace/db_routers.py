@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+import random
+import time
+
+REPLICA_LAG_KEY = 'replica-lag:{alias}'
+STICKY_COOKIE = 'primary_until'
+STICKY_HEADER = 'X-Primary-Until'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# Seconds behind the primary; zero when the standby has replayed all it received
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+@contextmanager
+def replica_reads():
+    """Route reads in this block to a replica that is within REPLICA_MAX_LAG_SECONDS"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+def replica_lag(alias):
+    """Replication lag of a replica in seconds, measured at most every REPLICA_LAG_CHECK_SECONDS"""
+    key = REPLICA_LAG_KEY.format(alias=alias)
+    lag = cache.get(key)
+    if lag is None:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            # Unreachable replicas are skipped until the next check
+            lag = float('inf')
+        cache.set(key, lag, timeout=settings.REPLICA_LAG_CHECK_SECONDS)
+    return lag
+
+def sticky_until(request):
+    """Read-your-writes deadline from the client's cookie or header, if still current"""
+    value = request.COOKIES.get(STICKY_COOKIE) or request.headers.get(STICKY_HEADER)
+    try:
+        until = float(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time()
+    # Bounded so a forged value cannot pin a client to the primary indefinitely
+    if now < until <= now + settings.REPLICA_STICKY_SECONDS:
+        return until
+    return None
+
+class ReplicaRouter:
+    """
+    Send reads to a replica inside replica_reads(), everything else to default.
+
+    Replicas are the DATABASE_REPLICAS aliases; one lagging more than
+    REPLICA_MAX_LAG_SECONDS is skipped, and with none healthy reads stay on
+    the primary. Migrations only run on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+        healthy = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+        ]
+        return random.choice(healthy) if healthy else None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+class ReplicaReadMixin:
+    """
+    Serve ``replica_actions`` of a viewset from a replica.
+
+    Only safe methods are routed, and not for a client that wrote within
+    REPLICA_STICKY_SECONDS (see ReplicaStickinessMiddleware). Views without
+    actions (generic views) route every safe request. Actions whose reads
+    feed caches keyed by batch version stay on the primary, so a lagging
+    replica never caches a stale payload under a new version.
+    """
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None)
+        if (
+            request.method in SAFE_METHODS
+            and (action is None or action in self.replica_actions)
+            and sticky_until(request) is None
+        ):
+            self._replica_token = _replica_reads.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            token = getattr(self, '_replica_token', None)
+            if token is not None:
+                _replica_reads.reset(token)
+                self._replica_token = None
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+import time
+
+from .db_routers import STICKY_COOKIE, STICKY_HEADER
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/geo+json', 'application/vnd.mapbox-vector-tile', 'text/')
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header with a non-zero q-value"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip compress API responses larger than COMPRESSION_MIN_BYTES.
+
+    Brotli is preferred when the client accepts it and the brotli package is
+    installed. Streaming responses (exports) are left alone; they compress
+    themselves with ``?gzip=1``. Like GZipMiddleware, gzip bodies get random
+    padding against BREACH and strong ETags are weakened.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=100)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+class ReplicaStickinessMiddleware:
+    """
+    Pin a client to the primary for REPLICA_STICKY_SECONDS after it writes.
+
+    Successful unsafe requests set a ``primary_until`` cookie and an
+    ``X-Primary-Until`` header; browsers send the cookie back and API clients
+    echo the header, and ReplicaReadMixin reads from the primary until then.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+            return response
+
+        until = time.time() + settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            STICKY_COOKIE, f'{until:.3f}', max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True, samesite='Lax'
+        )
+        response[STICKY_HEADER] = f'{until:.3f}'
+        return response
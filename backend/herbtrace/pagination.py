@@ -0,0 +1,69 @@
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+class StandardPageNumberPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a stable ordering.
+
+    Views with an OrderingFilter page on their ``ordering``, which should end
+    with a unique tie-breaker and be backed by a matching composite index.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-pk')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Ranked search results page on their rank unless the client orders explicitly
+        if 'search_rank' in queryset.query.annotations and not request.query_params.get('ordering'):
+            return ('-search_rank',) + tuple(ordering)
+        return ordering
+
+class HybridPagination(BasePagination):
+    """
+    Keyset pagination by default, page-number pagination when ``?page=`` is given.
+
+    Page-number mode runs COUNT(*) and OFFSET queries, so it is only meant for
+    UI tables that need page links; feeds and sync clients should follow the
+    ``next`` cursor instead.
+    """
+    page_query_param = 'page'
+
+    def __init__(self):
+        self.cursor_paginator = KeysetPagination()
+        self.page_paginator = StandardPageNumberPagination()
+        self.paginator = self.cursor_paginator
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param in request.query_params:
+            self.paginator = self.page_paginator
+        else:
+            self.paginator = self.cursor_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.cursor_paginator.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = self.cursor_paginator.get_schema_operation_parameters(view)
+        names = {parameter['name'] for parameter in parameters}
+        for parameter in self.page_paginator.get_schema_operation_parameters(view):
+            if parameter['name'] not in names:
+                parameters.append(parameter)
+        return parameters
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
@@ -0,0 +1,31 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+import orjson
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson.
+
+    orjson encodes dicts, lists and UUIDs natively; anything else (dates and
+    times, Decimal, timedelta, lazy strings, querysets) goes through DRF's
+    JSONEncoder.default, so the output matches JSONRenderer, including its
+    millisecond datetimes with a ``Z`` suffix. Data orjson rejects, such as
+    integers wider than 64 bits, falls back to JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Valid JSON but not valid JavaScript, escaped like JSONRenderer does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,4 +1,5 @@
 import os
+from celery.schedules import crontab
 from decouple import config
 from pathlib import Path
 
@@ -16,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'django_extensions',
@@ -28,6 +30,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'herbtrace.middleware.CompressionMiddleware',
+    'herbtrace.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,6 +72,108 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated hosts sharing the primary's credentials, as
+# aliases replica_0, replica_1, ... For a local second alias against the same
+# database set DB_REPLICA_HOSTS=localhost; tests mirror replicas onto default.
+DATABASE_REPLICAS = []
+for index, host in enumerate(h.strip() for h in config('DB_REPLICA_HOSTS', default='').split(',') if h.strip()):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['herbtrace.db_routers.ReplicaRouter']
+
+# Replicas further behind than this are skipped; lag is re-measured every check interval
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=float)
+REPLICA_LAG_CHECK_SECONDS = 5
+
+# Clients read from the primary for this long after their own writes
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='herbtrace'),
+    }
+}
+
+# Rendered batch detail/verification payloads, invalidated by batch version
+VERIFICATION_CACHE_TIMEOUT = config('VERIFICATION_CACHE_TIMEOUT', default=900, cast=int)
+# Batch version keys; an expired one is reseeded from the clock, so ETags never repeat
+BATCH_VERSION_TIMEOUT = config('BATCH_VERSION_TIMEOUT', default=86400, cast=int)
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=60, cast=int)
+
+# Timeline entries inlined in batch detail; the rest is paginated via /timeline/
+TIMELINE_DETAIL_LIMIT = 50
+
+# Processing events and quality tests inlined in batch detail; the rest are
+# paginated via /events/ and /tests/
+BATCH_DETAIL_HISTORY_LIMIT = 10
+
+# Map clustering: per-tile grid of CLUSTER_GRID_CELLS x CLUSTER_GRID_CELLS cells
+CLUSTER_GRID_CELLS = 8
+CLUSTER_MAX_ZOOM = 16
+CLUSTER_MAX_TILES = 64
+CLUSTER_CACHE_TIMEOUT = config('CLUSTER_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Mapbox Vector Tiles, cached on disk under per-tile versions kept in the cache;
+# versions expire after TILE_CACHE_TIMEOUT, which also bounds cluster staleness
+TILE_CACHE_DIR = config('TILE_CACHE_DIR', default=os.path.join(BASE_DIR, 'tile_cache'))
+TILE_MAX_ZOOM = 18
+TILE_CACHE_TIMEOUT = config('TILE_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Nearby searches always return at most NEARBY_MAX_LIMIT rows per request
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 200
+
+# Batch anomaly detection
+DUPLICATE_DISTANCE_METERS = 200
+DUPLICATE_WINDOW_HOURS = 6
+DUPLICATE_SWEEP_NEIGHBOURS = 5
+QUANTITY_Z_THRESHOLD = 3.0
+QUANTITY_MIN_SAMPLES = 30
+
+# Reject batches collected outside their species habitat polygons
+HABITAT_VALIDATION_ENABLED = config('HABITAT_VALIDATION_ENABLED', default=True, cast=bool)
+HABITAT_VERSION_CHECK_SECONDS = 5
+
+# Largest offline backlog accepted by one /batches/bulk/ request
+BULK_BATCH_MAX_ITEMS = 500
+
+# Largest shipment accepted by one /batches/verify-many/ request
+VERIFY_MANY_MAX_ITEMS = 500
+
+# API key usage is counted in this cache and written back on this interval by
+# Celery beat; a process-local cache fails the authentication.E001 check
+# outside DEBUG, and each process then flushes its own counters
+API_KEY_USAGE_CACHE = config('API_KEY_USAGE_CACHE', default='default')
+API_KEY_USAGE_FLUSH_SECONDS = 60
+
+# Change feed: entries younger than the settle window wait for the next poll
+CHANGE_FEED_SETTLE_SECONDS = 2
+CHANGE_FEED_DEFAULT_LIMIT = 500
+CHANGE_FEED_MAX_LIMIT = 2000
+CHANGE_LOG_RETENTION_DAYS = 30
+
+# Stored responses of POSTs sent with an Idempotency-Key header
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+# Seconds a claimed key with no stored response blocks retries, should its request die
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Serve default-shape batch, verification and blockchain transaction lists
+# from values() rows instead of model instances
+FAST_LIST_SERIALIZATION = config('FAST_LIST_SERIALIZATION', default=False, cast=bool)
+
+# GeoJSON point coordinates are rounded to this many decimals (6 is ~0.1 m)
+GEOJSON_COORDINATE_PRECISION = config('GEOJSON_COORDINATE_PRECISION', default=6, cast=int)
+
+# Responses at least this large are brotli (if installed) or gzip compressed
+COMPRESSION_MIN_BYTES = 1024
+BROTLI_QUALITY = 4
+
+# How often processes check whether the in-memory species catalogue is stale
+SPECIES_CATALOGUE_CHECK_SECONDS = 5
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -77,6 +183,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'herbtrace.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -150,5 +260,23 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'sweep-batch-anomalies': {
+        'task': 'traceability.tasks.sweep_batch_anomalies_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'prune-change-log': {
+        'task': 'traceability.tasks.prune_change_log_task',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'prune-idempotency-keys': {
+        'task': 'traceability.tasks.prune_idempotency_keys_task',
+        'schedule': crontab(minute=15),
+    },
+    'flush-api-key-usage': {
+        'task': 'authentication.tasks.flush_api_key_usage_task',
+        'schedule': API_KEY_USAGE_FLUSH_SECONDS,
+    },
+}
 
 GDAL_LIBRARY_PATH = r"C:\Program Files\GDAL\bin\gdal.dll"
\ No newline at end of file
@@ -1,11 +1,23 @@
 import pytest
 from django.contrib.auth import get_user_model
 from django.contrib.gis.geos import Point
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
+from traceability.catalogue import species_catalogue
+from traceability.habitats import habitat_registry
 
 User = get_user_model()
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Keep cached payloads and process-local registries from leaking between tests"""
+    cache.clear()
+    species_catalogue.invalidate()
+    habitat_registry.invalidate()
+    yield
+    cache.clear()
+
 @pytest.fixture
 def api_client():
     """API client for testing"""
@@ -79,6 +79,87 @@ class TestAuthentication:
         assert 'key' in response.data
         assert response.data['name'] == 'Test API Key'
     
+    def test_api_key_usage_buffered(self, authenticated_client, monkeypatch):
+        """Test API key auth writes nothing and usage is flushed with one UPDATE"""
+        import time
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIRequestFactory
+        from authentication import usage
+        from authentication.authentication import APIKeyAuthentication
+        from authentication.models import APIKey
+        from authentication.usage import flush_api_key_usage
+        
+        # The test cache is process-local, so keep its self-flush from running mid-test
+        monkeypatch.setattr(usage, '_last_local_flush', time.monotonic())
+        api_key = APIKey.objects.create(user=authenticated_client.user, name='Mobile')
+        request = APIRequestFactory().get('/', HTTP_X_API_KEY=api_key.key)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                assert APIKeyAuthentication().authenticate(request)[1] == api_key
+        assert not [q for q in queries if not q['sql'].startswith('SELECT')]
+        
+        response = authenticated_client.get(reverse('user_stats'))
+        assert response.data['api_stats']['total_api_usage'] == 3
+        
+        with CaptureQueriesContext(connection) as queries:
+            assert flush_api_key_usage() == 3
+        assert len([q for q in queries if q['sql'].startswith('UPDATE')]) == 1
+        api_key.refresh_from_db()
+        assert api_key.usage_count == 3
+        assert api_key.last_used is not None
+        
+        assert flush_api_key_usage() == 0
+        response = authenticated_client.get(reverse('user_stats'))
+        assert response.data['api_stats']['total_api_usage'] == 3
+    
+    def test_api_key_usage_local_cache(self, user_factory, settings, monkeypatch):
+        """Test a process-local usage cache fails the system check and flushes in-process"""
+        from authentication import usage
+        from authentication.checks import check_api_key_usage_cache
+        from authentication.models import APIKey
+        
+        settings.DEBUG = False
+        assert [error.id for error in check_api_key_usage_cache(None)] == ['authentication.E001']
+        
+        api_key = APIKey.objects.create(user=user_factory(), name='Mobile')
+        monkeypatch.setattr(usage, '_last_local_flush', float('-inf'))
+        usage.record_api_key_use(api_key.id)
+        api_key.refresh_from_db()
+        assert api_key.usage_count == 1
+    
+    def test_api_key_usage_kept_on_failed_flush(self, authenticated_client, monkeypatch):
+        """Test buffered usage survives a flush whose UPDATE fails"""
+        import time
+        from django.db import DatabaseError
+        from django.db.models import QuerySet
+        from authentication import usage
+        from authentication.models import APIKey
+        
+        monkeypatch.setattr(usage, '_last_local_flush', time.monotonic())
+        api_key = APIKey.objects.create(user=authenticated_client.user, name='Mobile')
+        usage.record_api_key_use(api_key.id)
+        usage.record_api_key_use(api_key.id)
+        
+        def fail(*args, **kwargs):
+            raise DatabaseError('connection lost')
+        
+        with monkeypatch.context() as patched:
+            patched.setattr(QuerySet, 'update', fail)
+            with pytest.raises(DatabaseError):
+                usage.flush_api_key_usage()
+        assert usage.pending_api_key_usage([api_key.id])[api_key.id][0] == 2
+        
+        assert usage.flush_api_key_usage() == 2
+        api_key.refresh_from_db()
+        assert api_key.usage_count == 2
+    
+    def test_session_list(self, authenticated_client):
+        """Test sessions list with the page-number default pagination"""
+        response = authenticated_client.get(reverse('sessions'))
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' in response.data
+    
     def test_unauthorized_access(self, api_client):
         """Test that unauthorized requests are rejected"""
         url = reverse('profile')
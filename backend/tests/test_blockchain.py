@@ -24,7 +24,7 @@ class TestBlockchainAPI:
         BlockchainTransactionFactory.create_batch(3)
         
         url = reverse('blockchain_transactions')
-        response = authenticated_client.get(url)
+        response = authenticated_client.get(url, {'page': 1})
         
         assert response.status_code == status.HTTP_200_OK
         assert response.data['count'] == 3
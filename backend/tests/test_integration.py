@@ -75,3 +75,109 @@ class TestIntegration:
         assert response.status_code == 200
         # Should find the Bangalore batch but not Mumbai
         assert len(response.data['results']) >= 1
+
+    def test_batch_clusters(self, authenticated_client):
+        """Test map clusters aggregate nearby batches per tile"""
+        from django.contrib.gis.geos import Point
+        BatchFactory(collection_location=Point(77.5946, 12.9716, srid=4326), quantity_kg='10.000')
+        BatchFactory(collection_location=Point(77.5950, 12.9720, srid=4326), quantity_kg='5.000')
+        
+        from django.urls import reverse
+        url = reverse('batch-clusters')
+        params = {'bbox': '68,8,97,37', 'zoom': 4}
+        
+        response = authenticated_client.get(url, params)
+        assert response.status_code == 200
+        assert sum(f['properties']['count'] for f in response.data['features']) == 2
+        
+        # New batches invalidate the cached tile they fall into
+        BatchFactory(collection_location=Point(77.6, 12.97, srid=4326))
+        response = authenticated_client.get(url, params)
+        assert sum(f['properties']['count'] for f in response.data['features']) == 3
+        
+        # A moved batch leaves the tile it was cached in
+        moved = BatchFactory(collection_location=Point(72.8777, 19.0760, srid=4326))
+        mumbai = {'bbox': '72,18,74,20', 'zoom': 10}
+        assert sum(f['properties']['count'] for f in authenticated_client.get(url, mumbai).data['features']) == 1
+        moved.collection_location = Point(77.59, 12.97, srid=4326)
+        moved.save()
+        assert sum(f['properties']['count'] for f in authenticated_client.get(url, mumbai).data['features']) == 0
+        
+        response = authenticated_client.get(url, {'bbox': '68,8,97,37'})
+        assert response.status_code == 400
+
+    def test_vector_tiles(self, authenticated_client, settings, tmp_path):
+        """Test vector tiles are cached on disk per tile version and retired by new points"""
+        from django.contrib.gis.geos import Point
+        from traceability.tiles import tile_for_point, tile_version
+        settings.TILE_CACHE_DIR = str(tmp_path)
+        
+        point = Point(77.5946, 12.9716, srid=4326)
+        BatchFactory(collection_location=point)
+        x, y = tile_for_point(point.x, point.y, 6)
+        
+        def cached_path(layer):
+            return tmp_path / layer / '6' / str(x) / f'{y}.{tile_version(layer, 6, x, y)}.mvt'
+        
+        from django.urls import reverse
+        url = reverse('vector_tile', kwargs={'layer': 'collections', 'z': 6, 'x': x, 'y': y})
+        response = authenticated_client.get(url)
+        
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/vnd.mapbox-vector-tile'
+        assert response.content
+        assert cached_path('collections').exists()
+        
+        # The new version is shared through the cache, so every host re-renders
+        BatchFactory(collection_location=Point(77.6, 12.98, srid=4326))
+        assert not cached_path('collections').exists()
+        authenticated_client.get(url)
+        assert [path.name for path in cached_path('collections').parent.iterdir()] == [cached_path('collections').name]
+        
+        # Moving a point away retires the tile it left
+        from tests.factories import CollectorFactory
+        collector = CollectorFactory(location=point)
+        url = reverse('vector_tile', kwargs={'layer': 'collectors', 'z': 6, 'x': x, 'y': y})
+        before = authenticated_client.get(url).content
+        assert cached_path('collectors').exists()
+        collector.location = Point(72.8777, 19.0760, srid=4326)
+        collector.save()
+        assert not cached_path('collectors').exists()
+        assert authenticated_client.get(url).content != before
+        
+        url = reverse('vector_tile', kwargs={'layer': 'unknown', 'z': 6, 'x': x, 'y': y})
+        assert authenticated_client.get(url).status_code == 404
+
+    def test_batch_export(self, authenticated_client):
+        """Test batches stream out with their events and tests in every format"""
+        import gzip
+        import json
+        batch = BatchFactory()
+        ProcessingEventFactory.create_batch(2, batch=batch)
+        QualityTestFactory(batch=batch)
+        BatchFactory()
+        
+        from django.urls import reverse
+        url = reverse('batch-export')
+        response = authenticated_client.get(url, {'output': 'ndjson'})
+        assert response.status_code == 200
+        assert response.streaming
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert len(rows) == 2
+        row = next(row for row in rows if row['batch_id'] == batch.batch_id)
+        assert len(row['processing_events']) == 2
+        assert len(row['quality_tests']) == 1
+        
+        response = authenticated_client.get(url, {
+            'output': 'csv', 'fields': 'batch_id,quantity_kg', 'species': str(batch.species_id), 'gzip': '1'
+        })
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        assert lines[0] == 'batch_id,quantity_kg'
+        assert lines[1].startswith(batch.batch_id)
+        assert len(lines) == 2
+        
+        response = authenticated_client.get(url, {'output': 'geojsonseq', 'fields': 'batch_id'})
+        records = b''.join(response.streaming_content).decode().split('\x1e')[1:]
+        assert all(json.loads(record)['geometry']['type'] == 'Point' for record in records)
+        
+        assert authenticated_client.get(url, {'fields': 'password'}).status_code == 400
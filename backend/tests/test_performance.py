@@ -65,3 +65,307 @@ class TestPerformance:
             query_count = len(connection.queries)
             assert query_count < 10  # Should be efficient with joins
             assert response.status_code == 200
+
+class TestSingleFlight:
+    
+    def test_concurrent_calls_are_coalesced(self):
+        """Test that concurrent callers of one key share a single computation"""
+        import threading
+        from traceability.singleflight import SingleFlight
+        
+        flight = SingleFlight('test')
+        release = threading.Event()
+        calls = []
+        results = []
+        
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'payload'
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('batch', compute)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        deadline = time.time() + 5
+        while flight.stats()['coalesced'] < 9 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert results == ['payload'] * 10
+        assert flight.stats()['executed'] == 1
+        assert flight.stats()['coalesced'] == 9
+    
+    def test_get_or_build_uses_cache(self):
+        """Test that built values are published to the shared cache"""
+        from traceability.singleflight import SingleFlight
+        
+        flight = SingleFlight('test')
+        calls = []
+        
+        def build():
+            calls.append(1)
+            return {'total_batches': 5}
+        
+        assert flight.get_or_build('test-key', build, timeout=60) == {'total_batches': 5}
+        assert flight.get_or_build('test-key', build, timeout=60) == {'total_batches': 5}
+        assert len(calls) == 1
+
+@pytest.mark.django_db
+class TestFastListSerialization:
+    
+    def _create_rows(self):
+        from django.contrib.gis.geos import Point
+        from traceability.models import ConsumerVerification
+        from tests.factories import BlockchainTransactionFactory
+        
+        batches = [
+            BatchFactory(collection_location=Point(77.5946 + i / 100, 12.9716, srid=4326))
+            for i in range(5)
+        ]
+        for batch in batches:
+            ConsumerVerification.objects.create(batch=batch, consumer_location=Point(72.8777, 19.076, srid=4326))
+        ConsumerVerification.objects.create(batch=batches[0], ip_address='10.0.0.1')
+        BlockchainTransactionFactory.create_batch(3, transaction_fee='0.00042000')
+        BlockchainTransactionFactory(status='PENDING', block_number=None)
+    
+    @pytest.mark.parametrize('url_name', ['batch-list', 'consumerverification-list', 'blockchain_transactions'])
+    def test_fast_list_matches_serializer(self, authenticated_client, settings, url_name):
+        """Test the values() fast path renders exactly what the serializer renders"""
+        from django.urls import reverse
+        self._create_rows()
+        url = reverse(url_name)
+        
+        for params in [{}, {'page_size': 2}, {'page': 1}]:
+            settings.FAST_LIST_SERIALIZATION = False
+            expected = authenticated_client.get(url, params)
+            settings.FAST_LIST_SERIALIZATION = True
+            fast = authenticated_client.get(url, params)
+            
+            assert expected.status_code == fast.status_code == 200
+            assert fast.json() == expected.json()
+        
+        # The cursor position is read from values() rows
+        next_url = authenticated_client.get(url, {'page_size': 2}).json()['next']
+        settings.FAST_LIST_SERIALIZATION = False
+        expected = authenticated_client.get(next_url)
+        settings.FAST_LIST_SERIALIZATION = True
+        assert authenticated_client.get(next_url).json() == expected.json()
+    
+    def test_fast_list_encoder_queries(self, django_assert_num_queries):
+        """Test compiled row encoders render every row from a single values() query"""
+        from traceability.fastpath import get_row_encoder
+        from traceability.models import Batch
+        from traceability.serializers import BatchSerializer
+        
+        BatchFactory.create_batch(20)
+        encoder = get_row_encoder(BatchSerializer)
+        queryset = Batch.objects.order_by('batch_id')
+        expected = BatchSerializer(queryset, many=True).data
+        
+        with django_assert_num_queries(1):
+            fast = encoder.encode_many(encoder.values(queryset))
+        assert [f['id'] for f in fast['features']] == [f['id'] for f in expected['features']]
+    
+    @pytest.mark.benchmark
+    def test_fast_list_throughput(self):
+        """Test compiled row encoders serialize at least 3x more rows per second"""
+        from traceability.fastpath import get_row_encoder
+        from traceability.models import Batch
+        from traceability.serializers import BatchSerializer
+        
+        BatchFactory.create_batch(200)
+        encoder = get_row_encoder(BatchSerializer)
+        queryset = Batch.objects.order_by('batch_id')
+        
+        start_time = time.perf_counter()
+        expected = BatchSerializer(queryset, many=True).data
+        serializer_time = time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        fast = encoder.encode_many(encoder.values(queryset))
+        fast_time = time.perf_counter() - start_time
+        
+        assert len(fast['features']) == len(expected['features']) == 200
+        assert fast_time * 3 <= serializer_time
+
+@pytest.mark.django_db
+class TestRendering:
+    
+    def test_orjson_renderer_matches_json_renderer(self):
+        """Test the orjson renderer encodes like DRF's JSONRenderer"""
+        import json
+        import uuid
+        from datetime import datetime, date, time as dt_time, timezone as dt_timezone
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from herbtrace.renderers import ORJSONRenderer
+        
+        data = {
+            'quantity_kg': Decimal('12.500'),
+            'collected_at': datetime(2024, 3, 1, 6, 30, 15, 250000, tzinfo=dt_timezone.utc),
+            'recorded_at': datetime(2024, 3, 1, 6, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'collection_day': date(2024, 3, 1),
+            'harvest_time': dt_time(6, 30, 15, 123456),
+            'transaction_id': uuid.uuid4(),
+            'label': gettext_lazy('Premium'),
+            'counts': {1: 'one'},
+            'note': 'line\u2028separator',
+        }
+        rendered = ORJSONRenderer().render(data)
+        assert json.loads(rendered) == json.loads(JSONRenderer().render(data))
+        assert json.loads(rendered)['recorded_at'] == '2024-03-01T06:30:15.123Z'
+        assert b'\\u2028' in rendered
+        
+        # Wider than 64 bits, handled by the JSONRenderer fallback
+        assert json.loads(ORJSONRenderer().render({'wei': 2 ** 70})) == {'wei': 2 ** 70}
+    
+    def test_geojson_coordinates_rounded(self, authenticated_client, settings):
+        """Test list geometries are rounded to GEOJSON_COORDINATE_PRECISION decimals"""
+        from django.contrib.gis.geos import Point
+        from django.urls import reverse
+        
+        settings.GEOJSON_COORDINATE_PRECISION = 6
+        BatchFactory(collection_location=Point(77.123456789, 12.987654321, srid=4326))
+        
+        response = authenticated_client.get(reverse('batch-list'))
+        geometry = response.json()['results']['features'][0]['geometry']
+        assert geometry == {'type': 'Point', 'coordinates': [77.123457, 12.987654]}
+    
+    def test_response_compression(self, authenticated_client):
+        """Test large responses are compressed for clients that accept it"""
+        import gzip
+        from django.urls import reverse
+        
+        BatchFactory.create_batch(20)
+        url = reverse('batch-list')
+        
+        plain = authenticated_client.get(url)
+        assert 'Content-Encoding' not in plain
+        assert 'Accept-Encoding' in plain['Vary']
+        
+        compressed = authenticated_client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=1.0, identity;q=0.5')
+        assert compressed['Content-Encoding'] == 'gzip'
+        assert len(compressed.content) < len(plain.content)
+        assert gzip.decompress(compressed.content) == plain.content
+        
+        refused = authenticated_client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        assert 'Content-Encoding' not in refused
+
+# Most queries a list page may issue, whatever its size
+QUERY_BUDGET = 6
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    
+    def _add_rows(self, url_name, count, batches, processor):
+        import factory
+        from decimal import Decimal
+        from traceability.models import Batch, ProcessingEvent, QualityTest, ConsumerVerification
+        from tests.factories import ProcessingEventFactory, QualityTestFactory
+        
+        if url_name == 'batch-list':
+            start = Batch.objects.count()
+            Batch.objects.bulk_create(BatchFactory.build_batch(
+                count, species=batches[0].species, collector=batches[0].collector,
+                batch_id=factory.Sequence(lambda n: f'HTBUDGET{start + n:07d}'),
+            ))
+        elif url_name == 'processingevent-list':
+            ProcessingEvent.objects.bulk_create(ProcessingEventFactory.build_batch(
+                count, batch=factory.Iterator(batches), processor=processor,
+                output_quantity_kg=Decimal('9.500'), yield_percentage=Decimal('95.00'),
+            ))
+        elif url_name == 'qualitytest-list':
+            QualityTest.objects.bulk_create(QualityTestFactory.build_batch(count, batch=factory.Iterator(batches)))
+        else:
+            ConsumerVerification.objects.bulk_create([
+                ConsumerVerification(batch=batches[i % len(batches)]) for i in range(count)
+            ])
+    
+    @pytest.mark.parametrize('url_name', ['batch-list', 'processingevent-list', 'qualitytest-list',
+                                          'consumerverification-list'])
+    def test_list_query_count_is_constant(self, authenticated_client, url_name, django_assert_max_num_queries):
+        """Test list pages of 10, 100 and 1,000 rows issue the same number of queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+        
+        batches = BatchFactory.create_batch(3)
+        processor = UserFactory(user_type='PROCESSOR')
+        url = reverse(url_name)
+        
+        # Warm the species catalogue so it is not counted against the first size
+        authenticated_client.get(url)
+        
+        counts = []
+        created = 0
+        for size in [10, 100, 1000]:
+            self._add_rows(url_name, size - created, batches, processor)
+            created = size
+            with django_assert_max_num_queries(QUERY_BUDGET):
+                with CaptureQueriesContext(connection) as queries:
+                    response = authenticated_client.get(url, {'page_size': 100})
+            assert response.status_code == 200
+            counts.append(len(queries))
+        
+        assert counts[0] == counts[1] == counts[2]
+
+@pytest.mark.django_db
+class TestReplicaRouting:
+    
+    def test_router_skips_lagging_replicas(self, settings):
+        """Test reads go to a replica only inside replica_reads() and within the lag threshold"""
+        from herbtrace.db_routers import ReplicaRouter, REPLICA_LAG_KEY, replica_reads
+        from traceability.models import Batch
+        
+        settings.DATABASE_REPLICAS = ['replica_a', 'replica_b']
+        settings.REPLICA_MAX_LAG_SECONDS = 5
+        cache.set(REPLICA_LAG_KEY.format(alias='replica_a'), 1.0)
+        cache.set(REPLICA_LAG_KEY.format(alias='replica_b'), 30.0)
+        router = ReplicaRouter()
+        
+        assert router.db_for_read(Batch) is None
+        with replica_reads():
+            assert router.db_for_read(Batch) == 'replica_a'
+            assert router.db_for_write(Batch) == 'default'
+            cache.set(REPLICA_LAG_KEY.format(alias='replica_a'), float('inf'))
+            assert router.db_for_read(Batch) is None
+        assert not router.allow_migrate('replica_a', 'traceability')
+    
+    def test_reads_stick_to_primary_after_writes(self, authenticated_client, settings, monkeypatch):
+        """Test list reads use replicas until the client writes, then the primary"""
+        from django.urls import reverse
+        from herbtrace import db_routers
+        from tests.factories import HerbSpeciesFactory, CollectorFactory
+        
+        settings.DATABASE_REPLICAS = ['default']
+        checked = []
+        monkeypatch.setattr(db_routers, 'replica_lag', lambda alias: checked.append(alias) or 0)
+        batch = BatchFactory()
+        
+        authenticated_client.get(reverse('batch-list'))
+        assert checked
+        
+        checked.clear()
+        authenticated_client.get(reverse('batch-detail', kwargs={'pk': batch.batch_id}))
+        assert not checked
+        
+        response = authenticated_client.post(reverse('batch-list'), {
+            'species': HerbSpeciesFactory().id,
+            'collector': CollectorFactory().id,
+            'collection_date': '2024-01-15T10:00:00Z',
+            'collection_location': {'type': 'Point', 'coordinates': [77.5946, 12.9716]},
+            'quantity_kg': '25.500',
+        }, format='json')
+        assert response.status_code == 201
+        assert db_routers.STICKY_HEADER in response
+        
+        authenticated_client.get(reverse('batch-list'))
+        assert not checked
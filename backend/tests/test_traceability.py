@@ -1,7 +1,10 @@
 import pytest
 from django.urls import reverse
 from rest_framework import status
-from tests.factories import BatchFactory, HerbSpeciesFactory, CollectorFactory
+from tests.factories import BatchFactory, HerbSpeciesFactory, CollectorFactory, ProcessingEventFactory, QualityTestFactory
+from traceability.models import ConsumerVerification
+from traceability.catalogue import species_catalogue
+from traceability.cache import get_batch_versions, get_cached_batch_details
 
 @pytest.mark.django_db
 class TestTraceabilityAPI:
@@ -29,16 +32,156 @@ class TestTraceabilityAPI:
         assert response.status_code == status.HTTP_201_CREATED
         assert 'batch_id' in response.data
     
+    def test_create_batch_idempotency_key(self, authenticated_client):
+        """Test a retried POST with the same Idempotency-Key creates one batch"""
+        from traceability.models import Batch
+        species = HerbSpeciesFactory()
+        collector = CollectorFactory()
+        
+        url = reverse('batch-list')
+        data = {
+            'species': species.id,
+            'collector': collector.id,
+            'collection_date': '2024-01-15T10:00:00Z',
+            'collection_location': {'type': 'Point', 'coordinates': [77.5946, 12.9716]},
+            'quantity_kg': '25.500',
+        }
+        
+        first = authenticated_client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        retry = authenticated_client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert retry.data['batch_id'] == first.data['batch_id']
+        assert Batch.objects.count() == 1
+        
+        data['quantity_kg'] = '30.000'
+        response = authenticated_client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        
+        # A key claimed by a request still running is refused until its claim expires
+        from datetime import timedelta
+        from django.utils import timezone
+        from traceability.models import IdempotencyKey
+        claim = IdempotencyKey.objects.create(
+            user=authenticated_client.user, key='retry-2', request_fingerprint='',
+            expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        response = authenticated_client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='retry-2')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert Batch.objects.count() == 1
+        
+        claim.expires_at = timezone.now()
+        claim.save()
+        response = authenticated_client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='retry-2')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert IdempotencyKey.objects.get(key='retry-2').status_code == status.HTTP_201_CREATED
+    
     def test_batch_list(self, authenticated_client):
         """Test batch listing"""
         BatchFactory.create_batch(3)
         
         url = reverse('batch-list')
-        response = authenticated_client.get(url)
+        response = authenticated_client.get(url, {'page': 1})
         
         assert response.status_code == status.HTTP_200_OK
         assert response.data['count'] == 3
     
+    def test_batch_list_cursor_pagination(self, authenticated_client):
+        """Test batch listing walks the feed with keyset cursors"""
+        batches = BatchFactory.create_batch(5)
+        
+        url = reverse('batch-list')
+        seen = []
+        response = authenticated_client.get(url, {'page_size': 2})
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            seen.extend(feature['id'] for feature in response.data['results']['features'])
+            if not response.data['next']:
+                break
+            response = authenticated_client.get(response.data['next'])
+        
+        assert sorted(seen) == sorted(batch.batch_id for batch in batches)
+    
+    def test_batch_list_sparse_fields(self, authenticated_client):
+        """Test batch list default shape, ?fields= and ?expand="""
+        batch = BatchFactory()
+    
+        url = reverse('batch-list')
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        properties = response.data['results']['features'][0]['properties']
+        assert properties['species'] == batch.species_id
+        assert properties['collector'] == batch.collector_id
+        assert 'qr_code' not in properties
+    
+        response = authenticated_client.get(url, {'fields': 'quantity_kg'})
+        properties = response.data['results']['features'][0]['properties']
+        assert set(properties) == {'quantity_kg'}
+    
+        response = authenticated_client.get(url, {'fields': 'quantity_kg', 'expand': 'collector,species'})
+        properties = response.data['results']['features'][0]['properties']
+        assert properties['collector']['id'] == batch.collector_id
+        assert properties['species']['name'] == batch.species.name
+    
+        response = authenticated_client.get(url, {'fields': 'sustainability_score'})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_batch_search_document(self, authenticated_client, monkeypatch, django_capture_on_commit_callbacks):
+        """Test batch search matches species common and Sanskrit names, and partial names"""
+        from traceability.tasks import refresh_batch_search_documents_task
+        monkeypatch.setattr(refresh_batch_search_documents_task, 'apply_async',
+                            lambda kwargs: refresh_batch_search_documents_task(**kwargs))
+        species = HerbSpeciesFactory(name='Ashwagandha', sanskrit_name='Varahakarni', common_names=['Winter Cherry'])
+        match = BatchFactory(species=species)
+        BatchFactory.create_batch(2)
+        
+        url = reverse('batch-list')
+        # 'ashwag' is no word of the document, so it matches through the trigram ILIKE
+        for term in ['cherry', 'varahakarni', 'ashwag', match.batch_id[:8]]:
+            response = authenticated_client.get(url, {'search': term})
+            assert response.status_code == status.HTTP_200_OK
+            ids = [feature['id'] for feature in response.data['results']['features']]
+            assert ids[0] == match.batch_id
+        
+        species.common_names = ['Indian Ginseng']
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            species.save()
+        assert callbacks
+        response = authenticated_client.get(url, {'search': 'ginseng'})
+        assert [feature['id'] for feature in response.data['results']['features']] == [match.batch_id]
+        
+        # Saves that keep the searched names queue no refresh
+        with django_capture_on_commit_callbacks() as callbacks:
+            species.save(update_fields=['harvesting_season'])
+            species.save()
+        assert not callbacks
+    
+    def test_species_autocomplete(self, authenticated_client, django_assert_num_queries):
+        """Test species autocomplete over every name variant from the catalogue"""
+        species = HerbSpeciesFactory(
+            name='Ashwagandha', scientific_name='Withania somnifera',
+            sanskrit_name='Varahakarni', common_names=['Winter Cherry']
+        )
+        HerbSpeciesFactory(name='Brahmi', scientific_name='Bacopa monnieri', sanskrit_name='Saraswati', common_names=[])
+        
+        url = reverse('herbspecies-autocomplete')
+        response = authenticated_client.get(url, {'q': 'ashw'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [r['id'] for r in response.data['results']] == [species.id]
+        assert 'medicinal_properties' not in response.data['results'][0]
+        
+        for prefix, matched in [('SOMN', 'Withania somnifera'), ('varaha', 'Varahakarni'), ('cher', 'Winter Cherry')]:
+            with django_assert_num_queries(0):
+                results = species_catalogue.autocomplete(prefix)
+            assert [(r['id'], r['matched_name']) for r in results] == [(species.id, matched)]
+        
+        species.common_names = ['Indian Ginseng']
+        species.save()
+        response = authenticated_client.get(url, {'q': 'gins'})
+        assert [r['id'] for r in response.data['results']] == [species.id]
+    
     def test_batch_detail(self, authenticated_client):
         """Test batch detail view"""
         batch = BatchFactory()
@@ -51,6 +194,106 @@ class TestTraceabilityAPI:
         assert 'qr_code' in response.data
         assert 'sustainability_score' in response.data
     
+    def test_batch_detail_object_permissions(self, authenticated_client, monkeypatch):
+        """Test object permissions still apply to a detail served from the cache"""
+        from rest_framework.permissions import IsAuthenticated
+        from traceability.views import BatchViewSet
+        
+        class OwnCollectionsOnly(IsAuthenticated):
+            def has_object_permission(self, request, view, obj):
+                return obj.collector.user_id == request.user.pk
+        
+        batch = BatchFactory()
+        url = reverse('batch-detail', kwargs={'pk': batch.batch_id})
+        assert authenticated_client.get(url).status_code == status.HTTP_200_OK
+        
+        monkeypatch.setattr(BatchViewSet, 'permission_classes', [OwnCollectionsOnly])
+        assert authenticated_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_batch_detail_queries_flat(self, authenticated_client):
+        """Test inlined events and tests render batch_info without a query per row"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        def detail_queries(batch):
+            with CaptureQueriesContext(connection) as queries:
+                response = authenticated_client.get(reverse('batch-detail', kwargs={'pk': batch.batch_id}))
+            assert response.status_code == status.HTTP_200_OK
+            return len(queries)
+        
+        small, large = BatchFactory(), BatchFactory()
+        ProcessingEventFactory(batch=small)
+        QualityTestFactory(batch=small)
+        ProcessingEventFactory.create_batch(5, batch=large)
+        QualityTestFactory.create_batch(5, batch=large)
+        assert detail_queries(large) == detail_queries(small)
+    
+    def test_batch_detail_verification_queries(self, authenticated_client):
+        """Test retrieve and verify render recent verifications without a query per row"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        def queries(url_name, batch):
+            with CaptureQueriesContext(connection) as captured:
+                response = authenticated_client.get(reverse(url_name, kwargs={'pk': batch.batch_id}))
+            assert response.status_code == status.HTTP_200_OK
+            return len(captured)
+        
+        small, large = BatchFactory(), BatchFactory()
+        for batch, scans in ((small, 3), (large, 8)):
+            for _ in range(scans):
+                ConsumerVerification.objects.create(batch=batch)
+        for url_name in ('batch-detail', 'batch-verify'):
+            assert queries(url_name, large) == queries(url_name, small)
+    
+    def test_batch_version_bumped_on_commit(self, django_capture_on_commit_callbacks):
+        """Test a write bumps the batch version again once its transaction commits"""
+        from traceability.cache import get_batch_version
+        batch = BatchFactory()
+        before = get_batch_version(batch.batch_id)
+        
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            batch.quality_grade = 'B'
+            batch.save()
+        # A reader before the commit may cache the old rows under this version
+        during = get_batch_version(batch.batch_id)
+        assert during != before
+        
+        for callback in callbacks:
+            callback()
+        assert get_batch_version(batch.batch_id) not in (before, during)
+    
+    def test_batch_detail_history_paginated(self, authenticated_client, settings):
+        """Test batch detail inlines the first tests and pages the rest via /tests/"""
+        settings.BATCH_DETAIL_HISTORY_LIMIT = 2
+        batch = BatchFactory()
+        tests = QualityTestFactory.create_batch(5, batch=batch, pass_status=True)
+        QualityTestFactory(batch=batch, pass_status=False)
+    
+        response = authenticated_client.get(reverse('batch-detail', kwargs={'pk': batch.batch_id}))
+        assert response.status_code == status.HTTP_200_OK
+        properties = response.data['properties']
+        assert len(properties['quality_tests']) == 2
+        assert properties['quality_tests_summary']['count'] == 6
+        assert properties['quality_tests_summary']['failed'] == 1
+    
+        url = properties['quality_tests_summary']['url']
+        assert url == reverse('batch-tests', kwargs={'pk': batch.batch_id})
+        seen = []
+        response = authenticated_client.get(url, {'page_size': 4})
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(test['id'] for test in response.data['results'])
+            if not response.data['next']:
+                break
+            response = authenticated_client.get(response.data['next'])
+        assert len(seen) == 6
+        assert {test.id for test in tests} < set(seen)
+    
+        response = authenticated_client.get(reverse('batch-events', kwargs={'pk': batch.batch_id}))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results']['features'] == []
+    
     def test_batch_verification_public(self, api_client):
         """Test public batch verification"""
         batch = BatchFactory()
@@ -61,6 +304,111 @@ class TestTraceabilityAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['batch_id'] == batch.batch_id
     
+    def test_batch_verification_etag(self, api_client):
+        """Test verification payload is cached and revalidated by ETag"""
+        batch = BatchFactory()
+        url = reverse('batch-verify', kwargs={'pk': batch.batch_id})
+        
+        response = api_client.get(url)
+        etag = response['ETag']
+        assert response.status_code == status.HTTP_200_OK
+        
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        
+        # New processing events invalidate the cached payload
+        ProcessingEventFactory(batch=batch)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert len(response.data['processing_events']) == 1
+        
+        # Every scan is still recorded
+        assert ConsumerVerification.objects.filter(batch=batch).count() == 3
+        
+        # Verification fields are read per response, so a cached payload shows new scans
+        response = api_client.get(url)
+        properties = response.data['properties']
+        assert properties['verifications_count'] == 4
+        assert len(properties['recent_verifications']) == 4
+    
+    def test_batch_verify_many(self, api_client, django_assert_max_num_queries):
+        """Test a shipment is verified in one request with a verdict per batch"""
+        verified = BatchFactory(is_blockchain_verified=True)
+        failed = BatchFactory()
+        QualityTestFactory(batch=failed, pass_status=False)
+        cached = BatchFactory()
+        # Real detail payloads cached by the single-batch endpoint
+        for batch in (failed, cached):
+            api_client.get(reverse('batch-verify', kwargs={'pk': batch.batch_id}))
+        versions = get_batch_versions([failed.batch_id, cached.batch_id])
+        assert set(get_cached_batch_details(versions)) == {failed.batch_id, cached.batch_id}
+    
+        url = reverse('batch-verify-many')
+        batch_ids = [verified.batch_id, failed.batch_id, cached.batch_id, 'MISSING', verified.batch_id]
+        # One verdict query for the uncached batches and one bulk insert
+        with django_assert_max_num_queries(2):
+            response = api_client.post(url, {'batch_ids': batch_ids, 'lat': 12.97, 'lng': 77.59}, format='json')
+    
+        assert response.status_code == status.HTTP_200_OK
+        verdicts = {result['batch_id']: result['verdict'] for result in response.data['results']}
+        assert [result['batch_id'] for result in response.data['results']] == batch_ids[:4]
+        assert verdicts == {
+            verified.batch_id: 'VERIFIED',
+            failed.batch_id: 'FAILED_QUALITY',
+            cached.batch_id: 'UNVERIFIED',
+            'MISSING': 'NOT_FOUND',
+        }
+        results = {result['batch_id']: result for result in response.data['results']}
+        assert results[cached.batch_id]['species'] == cached.species.name
+        assert results[cached.batch_id]['status'] == cached.status
+        assert results[failed.batch_id]['failed_quality_tests'] == 1
+        assert ConsumerVerification.objects.filter(batch__in=[verified, failed, cached]).count() == 5
+    
+        response = api_client.post(url, {'batch_ids': []}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_batch_timeline_materialized(self, authenticated_client):
+        """Test timeline entries are maintained on write and paginated"""
+        batch = BatchFactory()
+        event = ProcessingEventFactory(batch=batch, facility_name='Old Mill')
+        QualityTestFactory(batch=batch)
+        assert batch.timeline_entries.count() == 3
+        
+        event.facility_name = 'New Mill'
+        event.save()
+        assert batch.timeline_entries.count() == 3
+        
+        url = reverse('batch-timeline', kwargs={'pk': batch.batch_id})
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        entries = response.data['results']
+        assert [entry['type'] for entry in entries][0] == 'COLLECTION'
+        assert any(entry['details'].get('facility') == 'New Mill' for entry in entries)
+        
+        event.delete()
+        assert batch.timeline_entries.count() == 2
+    
+    def test_rebuild_timelines_command(self):
+        """Test the backfill rebuilds lost timelines and retires cached details"""
+        from io import StringIO
+        from django.core.management import call_command
+        from traceability.cache import get_batch_version
+        from traceability.models import TimelineEntry
+        
+        batch = BatchFactory()
+        ProcessingEventFactory(batch=batch)
+        QualityTestFactory(batch=batch)
+        TimelineEntry.objects.all().delete()
+        version = get_batch_version(batch.batch_id)
+        
+        out = StringIO()
+        call_command('rebuild_timelines', stdout=out)
+        assert 'Rebuilt 1 timelines (3 entries)' in out.getvalue()
+        assert batch.timeline_entries.count() == 3
+        assert get_batch_version(batch.batch_id) != version
+    
     def test_batch_stats(self, authenticated_client):
         """Test batch statistics"""
         BatchFactory.create_batch(5)
@@ -87,6 +435,242 @@ class TestTraceabilityAPI:
         response = authenticated_client.get(url, params)
         assert response.status_code == status.HTTP_200_OK
     
+    def test_nearby_collections_knn_cursor(self, authenticated_client):
+        """Test nearby search is bounded, nearest-first and resumable"""
+        from django.contrib.gis.geos import Point
+        for offset in range(5):
+            BatchFactory(collection_location=Point(77.5946 + offset * 0.01, 12.9716, srid=4326))
+        BatchFactory(collection_location=Point(72.8777, 19.0760, srid=4326))  # Mumbai
+        
+        url = reverse('batch-nearby-collections')
+        params = {'lat': 12.9716, 'lng': 77.5946, 'radius': 50, 'limit': 3}
+        response = authenticated_client.get(url, params)
+        
+        assert response.status_code == status.HTTP_200_OK
+        first_page = response.data['results']['features']
+        assert len(first_page) == 3
+        distances = [feature['properties']['distance_km'] for feature in first_page]
+        assert distances == sorted(distances)
+        
+        response = authenticated_client.get(response.data['next'])
+        second_page = response.data['results']['features']
+        assert len(second_page) == 2
+        assert {f['id'] for f in first_page}.isdisjoint(f['id'] for f in second_page)
+        
+        # Rows in the corners of the bounding box never hold a page slot or a cursor
+        BatchFactory(collection_location=Point(77.5946 + 0.01, 12.9716 + 0.01, srid=4326))
+        response = authenticated_client.get(url, {'lat': 12.9716, 'lng': 77.5946, 'radius': 1.4, 'limit': 2})
+        assert len(response.data['results']['features']) == 2
+        assert response.data['next'] is None
+    
+    def test_duplicate_batch_flagged_on_create(self, authenticated_client):
+        """Test resubmitted harvests are flagged as likely duplicates"""
+        species = HerbSpeciesFactory()
+        collector = CollectorFactory()
+        
+        url = reverse('batch-list')
+        data = {
+            'species': species.id,
+            'collector': collector.id,
+            'collection_date': '2024-01-15T10:00:00Z',
+            'collection_location': {
+                'type': 'Point',
+                'coordinates': [77.5946, 12.9716]
+            },
+            'quantity_kg': '25.500',
+        }
+        
+        response = authenticated_client.post(url, data, format='json')
+        assert response.data['anomalies'] == []
+        
+        data['collection_date'] = '2024-01-15T11:30:00Z'
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [a['anomaly_type'] for a in response.data['anomalies']] == ['DUPLICATE']
+    
+    def test_bulk_create_batches(self, authenticated_client, django_assert_max_num_queries):
+        """Test an offline backlog is inserted in one request with per-item results"""
+        from traceability.models import Batch, TimelineEntry
+        species = HerbSpeciesFactory()
+        collector = CollectorFactory()
+        
+        items = [
+            {
+                'species': species.id,
+                'collector': collector.id,
+                'collection_date': f'2024-01-{day:02d}T10:00:00Z',
+                'collection_location': {'type': 'Point', 'coordinates': [77.5946, 12.9716]},
+                'quantity_kg': '25.500',
+            }
+            for day in range(1, 21)
+        ]
+        items.append({'species': species.id, 'collector': 999999, 'quantity_kg': 'lots'})
+        # Same place and day as the first item
+        items.append(dict(items[0], collection_date='2024-01-01T11:00:00Z'))
+        
+        url = reverse('batch-bulk')
+        with django_assert_max_num_queries(15):
+            response = authenticated_client.post(url, items, format='json')
+        
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert response.data['created'] == 21
+        results = response.data['results']
+        assert results[20]['status'] == 'error'
+        assert set(results[20]['errors']) >= {'collector', 'quantity_kg'}
+        created = [result['batch_id'] for result in results if result['status'] == 'created']
+        assert len(set(created)) == 21
+        assert Batch.objects.filter(batch_id__in=created).count() == 21
+        assert TimelineEntry.objects.filter(batch_id__in=created, source_type='COLLECTION').count() == 21
+        assert [a['related_batch'] for a in results[21]['anomalies']] == [results[0]['batch_id']]
+        assert results[0]['anomalies'] == []
+        
+        response = authenticated_client.post(url, {'species': species.id}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_batch_id_allocation(self):
+        """Test batch IDs from one species, collector and second are unique and time ordered"""
+        from datetime import datetime, timezone
+        from traceability.ids import allocate_batch_ids
+        
+        now = datetime(2024, 1, 15, 10, 0, 0, 500, tzinfo=timezone.utc)
+        first = allocate_batch_ids('HTASH001', 600, now=now)
+        second = allocate_batch_ids('HTASH001', 600, now=now)
+        later = allocate_batch_ids('HTASH001', 1, now=now.replace(second=5))
+        
+        ids = first + second + later
+        assert len(set(ids)) == len(ids)
+        assert ids == sorted(ids)
+        assert {len(batch_id) for batch_id in ids} == {len('HTASH001') + 17}
+        assert first[0] == 'HTASH00120240115100000000'
+        assert second[-1].startswith('HTASH00120240115100001')
+    
+    def test_batch_id_clash_retries(self, monkeypatch):
+        """Test a batch handed an existing ID is inserted under a fresh one instead of overwriting"""
+        from traceability import models
+        
+        existing = BatchFactory(quantity_kg='10.000')
+        ids = iter([existing.batch_id, existing.batch_id[:-3] + '999'])
+        monkeypatch.setattr(models, 'allocate_batch_id', lambda species_name, collector_id: next(ids))
+        
+        batch = BatchFactory()
+        assert batch.batch_id == existing.batch_id[:-3] + '999'
+        existing.refresh_from_db()
+        assert str(existing.quantity_kg) == '10.000'
+        assert models.Batch.objects.count() == 2
+    
+    def test_change_feed(self, authenticated_client, settings, django_capture_on_commit_callbacks):
+        """Test the change feed returns only rows changed since the sync token"""
+        settings.CHANGE_FEED_SETTLE_SECONDS = 0
+        url = reverse('change_feed')
+        head = authenticated_client.get(url).data['next_token']
+        
+        # Log entries are written when the transaction commits
+        with django_capture_on_commit_callbacks(execute=True):
+            batch = BatchFactory()
+            event = ProcessingEventFactory(batch=batch)
+            batch.status = 'PROCESSING'
+            batch.save()
+        
+        response = authenticated_client.get(url, {'since': head})
+        assert response.status_code == status.HTTP_200_OK
+        changes = {(c['model'], c['id']): c for c in response.data['changes']}
+        assert changes[('batch', batch.batch_id)]['data']['status'] == 'PROCESSING'
+        assert changes[('processing_event', str(event.id))]['op'] == 'upsert'
+        assert 'qr_code' not in changes[('batch', batch.batch_id)]['data']
+        
+        token = response.data['next_token']
+        assert authenticated_client.get(url, {'since': token}).data['changes'] == []
+        
+        event_id = str(event.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            event.delete()
+        response = authenticated_client.get(url, {'since': token, 'models': 'processing_event'})
+        assert response.data['changes'] == [{'model': 'processing_event', 'id': event_id, 'op': 'delete'}]
+        
+        assert authenticated_client.get(url, {'since': 'bogus'}).status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_change_feed_after_prune(self, authenticated_client, settings, django_capture_on_commit_callbacks):
+        """Test pruned tokens must resync while new clients start at the retained horizon"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from traceability.changes import prune_change_log
+        from traceability.models import ChangeLogEntry
+        
+        settings.CHANGE_FEED_SETTLE_SECONDS = 0
+        url = reverse('change_feed')
+        head = authenticated_client.get(url).data['next_token']
+        with django_capture_on_commit_callbacks(execute=True):
+            old, kept = BatchFactory(), BatchFactory()
+        ChangeLogEntry.objects.filter(object_id=old.batch_id).update(
+            changed_at=timezone.now() - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS + 1)
+        )
+        assert prune_change_log() >= 1
+        
+        assert authenticated_client.get(url, {'since': head}).status_code == status.HTTP_410_GONE
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert [c['id'] for c in response.data['changes'] if c['model'] == 'batch'] == [kept.batch_id]
+    
+    def test_anomaly_sweep(self):
+        """Test the nightly sweep flags same-collector batches close in space and time"""
+        from datetime import timedelta
+        from django.contrib.gis.geos import Point
+        from traceability.anomalies import sweep_batch_anomalies
+        from traceability.models import BatchAnomaly
+        
+        first = BatchFactory(collection_location=Point(77.5946, 12.9716, srid=4326))
+        second = BatchFactory(
+            collector=first.collector,
+            collection_date=first.collection_date + timedelta(hours=1),
+            collection_location=Point(77.5947, 12.9716, srid=4326)
+        )
+        BatchFactory(collector=first.collector, collection_date=first.collection_date + timedelta(days=3))
+        
+        assert sweep_batch_anomalies() == 1
+        anomaly = BatchAnomaly.objects.get()
+        assert anomaly.batch_id == second.batch_id
+        assert anomaly.related_batch_id == first.batch_id
+        
+        # Re-running replaces sweep flags instead of piling them up
+        assert sweep_batch_anomalies() == 1
+        assert BatchAnomaly.objects.count() == 1
+    
+    def test_batch_outside_habitat_rejected(self, authenticated_client):
+        """Test collection locations are validated against species habitats"""
+        from django.contrib.gis.geos import MultiPolygon, Polygon
+        from django.core.management import call_command
+        from traceability.models import BatchAnomaly, SpeciesHabitat
+        
+        species = HerbSpeciesFactory()
+        collector = CollectorFactory()
+        SpeciesHabitat.objects.create(
+            species=species,
+            name='Deccan plateau',
+            area=MultiPolygon(Polygon.from_bbox((74.0, 11.0, 79.0, 16.0)), srid=4326)
+        )
+        
+        url = reverse('batch-list')
+        data = {
+            'species': species.id,
+            'collector': collector.id,
+            'collection_date': '2024-01-15T10:00:00Z',
+            'collection_location': {'type': 'Point', 'coordinates': [77.5946, 12.9716]},
+            'quantity_kg': '25.500',
+        }
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        data['collection_location'] = {'type': 'Point', 'coordinates': [72.8777, 19.0760]}
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'collection_location' in response.data
+        
+        # Historical outliers are flagged by the bulk re-check
+        from django.contrib.gis.geos import Point
+        outlier = BatchFactory(species=species, collection_location=Point(72.8777, 19.0760, srid=4326))
+        call_command('check_batch_habitats')
+        assert list(BatchAnomaly.objects.filter(anomaly_type='OUT_OF_HABITAT').values_list('batch_id', flat=True)) == [outlier.batch_id]
+    
     def test_herb_species_crud(self, authenticated_client):
         """Test herb species CRUD operations"""
         # Create
@@ -118,3 +702,61 @@ class TestTraceabilityAPI:
         # Delete
         response = authenticated_client.delete(detail_url)
         assert response.status_code == status.HTTP_204_NO_CONTENT
+    
+    def test_conditional_get(self, authenticated_client):
+        """Test detail and list validators answer unchanged resources with 304"""
+        species = HerbSpeciesFactory()
+        detail_url = reverse('herbspecies-detail', kwargs={'pk': species.id})
+        
+        response = authenticated_client.get(detail_url)
+        assert response.status_code == status.HTTP_200_OK
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        
+        response = authenticated_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        response = authenticated_client.get(detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+        species.name = 'Renamed'
+        species.save()
+        response = authenticated_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        
+        BatchFactory.create_batch(3)
+        url = reverse('batch-list')
+        response = authenticated_client.get(url)
+        etag = response['ETag']
+        # MAX(updated_at) cannot show deletes, so lists are validated by ETag only
+        assert 'Last-Modified' not in response
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        # Another filter set, cursor or field selection is another representation
+        assert authenticated_client.get(url, {'fields': 'status'}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        
+        BatchFactory()
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+    
+    def test_conditional_get_related_rows(self, authenticated_client):
+        """Test list and detail ETags change when related rows they render change"""
+        collector = CollectorFactory()
+        url = reverse('collector-list')
+        detail_url = reverse('collector-detail', kwargs={'pk': collector.pk})
+        etag = authenticated_client.get(url)['ETag']
+        detail_etag = authenticated_client.get(detail_url)['ETag']
+        
+        collector.user.first_name = 'Renamed'
+        collector.user.save()
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        assert authenticated_client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == status.HTTP_200_OK
+        
+        etag = authenticated_client.get(url)['ETag']
+        collector.specializations.add(HerbSpeciesFactory())
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        
+        batch = BatchFactory()
+        url = reverse('batch-list')
+        etag = authenticated_client.get(url, {'fields': 'processing_events_count'})['ETag']
+        ProcessingEventFactory(batch=batch)
+        response = authenticated_client.get(url, {'fields': 'processing_events_count'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.gis.admin import OSMGeoAdmin
-from .models import HerbSpecies, Collector, Batch, ProcessingEvent, QualityTest, ConsumerVerification
+from .models import HerbSpecies, Collector, Batch, ProcessingEvent, QualityTest, ConsumerVerification, BatchAnomaly, SpeciesHabitat
 
 @admin.register(HerbSpecies)
 class HerbSpeciesAdmin(admin.ModelAdmin):
@@ -8,6 +8,12 @@ class HerbSpeciesAdmin(admin.ModelAdmin):
     search_fields = ['name', 'scientific_name', 'sanskrit_name']
     list_filter = ['created_at']
 
+@admin.register(SpeciesHabitat)
+class SpeciesHabitatAdmin(OSMGeoAdmin):
+    list_display = ['species', 'name', 'source', 'updated_at']
+    list_filter = ['species']
+    search_fields = ['species__name', 'name', 'source']
+
 @admin.register(Collector)
 class CollectorAdmin(OSMGeoAdmin):
     list_display = ['collector_id', 'user', 'certification_level', 'is_verified', 'created_at']
@@ -66,3 +72,10 @@ class ConsumerVerificationAdmin(OSMGeoAdmin):
     list_filter = ['verification_method', 'verification_date']
     search_fields = ['batch__batch_id']
     readonly_fields = ['verification_date', 'user_agent', 'ip_address']
+
+@admin.register(BatchAnomaly)
+class BatchAnomalyAdmin(admin.ModelAdmin):
+    list_display = ['batch', 'anomaly_type', 'related_batch', 'score', 'detected_by', 'is_resolved', 'detected_at']
+    list_filter = ['anomaly_type', 'detected_by', 'is_resolved', 'detected_at']
+    search_fields = ['batch__batch_id', 'related_batch__batch_id']
+    readonly_fields = ['detected_at']
@@ -0,0 +1,236 @@
+from django.conf import settings
+from django.contrib.gis.measure import Distance
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import FloatField, Func
+from datetime import timedelta
+import math
+import numpy as np
+
+from .models import Batch, BatchAnomaly
+
+SPECIES_QUANTITY_STATS_KEY = 'species-quantity-stats'
+
+EARTH_RADIUS_M = 6371008.8
+
+def _quantity_zscore(batch, species_stats=None):
+    """z-score of log quantity against the species statistics of the last sweep"""
+    if species_stats is None:
+        species_stats = cache.get(SPECIES_QUANTITY_STATS_KEY) or {}
+    stats = species_stats.get(batch.species_id)
+    if not stats or stats['count'] < settings.QUANTITY_MIN_SAMPLES or not stats['std']:
+        return None
+    return (math.log(max(float(batch.quantity_kg), 1e-6)) - stats['mean']) / stats['std']
+
+def detect_batch_anomalies(batch):
+    """
+    Flag likely duplicates and out-of-range quantities of a new batch.
+
+    Duplicates are same-collector batches within DUPLICATE_WINDOW_HOURS and
+    DUPLICATE_DISTANCE_METERS, found with one lookup on the (collector,
+    collection_date) index. Quantities are checked against species
+    statistics cached by the nightly sweep, without touching the database.
+    """
+    window = timedelta(hours=settings.DUPLICATE_WINDOW_HOURS)
+    duplicates = Batch.objects.filter(
+        collector_id=batch.collector_id,
+        collection_date__range=(batch.collection_date - window, batch.collection_date + window),
+        collection_location__distance_lte=(
+            batch.collection_location, Distance(m=settings.DUPLICATE_DISTANCE_METERS)
+        ),
+    ).exclude(pk=batch.pk).values_list('batch_id', flat=True)[:5]
+
+    anomalies = [
+        BatchAnomaly(
+            batch=batch,
+            anomaly_type='DUPLICATE',
+            related_batch_id=duplicate_id,
+            score=1.0,
+            detected_by='INGEST',
+        )
+        for duplicate_id in duplicates
+    ]
+
+    zscore = _quantity_zscore(batch)
+    if zscore is not None and abs(zscore) > settings.QUANTITY_Z_THRESHOLD:
+        anomalies.append(BatchAnomaly(
+            batch=batch,
+            anomaly_type='QUANTITY_OUTLIER',
+            score=abs(zscore),
+            details={'zscore': round(zscore, 2)},
+            detected_by='INGEST',
+        ))
+
+    if anomalies:
+        BatchAnomaly.objects.bulk_create(anomalies)
+    return anomalies
+
+def detect_bulk_anomalies(batches):
+    """
+    detect_batch_anomalies for a set of newly inserted batches.
+
+    Candidate duplicates of all batches are read in one query over the
+    collectors and time span involved and compared in memory. Within the set
+    a batch is only compared with the ones before it, as if they had been
+    created one by one.
+    """
+    if not batches:
+        return []
+    window = timedelta(hours=settings.DUPLICATE_WINDOW_HOURS)
+    new_ids = {batch.batch_id: index for index, batch in enumerate(batches)}
+    candidates = {}
+    rows = Batch.objects.filter(
+        collector_id__in={batch.collector_id for batch in batches},
+        collection_date__range=(
+            min(batch.collection_date for batch in batches) - window,
+            max(batch.collection_date for batch in batches) + window,
+        ),
+    ).annotate(
+        lng=Func('collection_location', function='ST_X', output_field=FloatField()),
+        lat=Func('collection_location', function='ST_Y', output_field=FloatField()),
+    ).values_list('batch_id', 'collector_id', 'collection_date', 'lng', 'lat').order_by('collection_date')
+    for batch_id, collector_id, collected, lng, lat in rows:
+        candidates.setdefault(collector_id, []).append((batch_id, collected, lng, lat))
+
+    species_stats = cache.get(SPECIES_QUANTITY_STATS_KEY) or {}
+    anomalies = []
+    for index, batch in enumerate(batches):
+        point = batch.collection_location
+        duplicates = [
+            batch_id for batch_id, collected, lng, lat in candidates.get(batch.collector_id, [])
+            if new_ids.get(batch_id, -1) < index
+            and abs(collected - batch.collection_date) <= window
+            and _haversine_m(point.x, point.y, lng, lat) <= settings.DUPLICATE_DISTANCE_METERS
+        ]
+        for duplicate_id in duplicates[:5]:
+            anomalies.append(BatchAnomaly(
+                batch=batch,
+                anomaly_type='DUPLICATE',
+                related_batch_id=duplicate_id,
+                score=1.0,
+                detected_by='INGEST',
+            ))
+
+        zscore = _quantity_zscore(batch, species_stats)
+        if zscore is not None and abs(zscore) > settings.QUANTITY_Z_THRESHOLD:
+            anomalies.append(BatchAnomaly(
+                batch=batch,
+                anomaly_type='QUANTITY_OUTLIER',
+                score=abs(zscore),
+                details={'zscore': round(zscore, 2)},
+                detected_by='INGEST',
+            ))
+
+    if anomalies:
+        BatchAnomaly.objects.bulk_create(anomalies)
+    return anomalies
+
+def _haversine_m(lng1, lat1, lng2, lat2):
+    lng1, lat1, lng2, lat2 = map(np.radians, (lng1, lat1, lng2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def _load_batch_arrays():
+    rows = Batch.objects.annotate(
+        lng=Func('collection_location', function='ST_X', output_field=FloatField()),
+        lat=Func('collection_location', function='ST_Y', output_field=FloatField()),
+    ).values_list(
+        'batch_id', 'collector_id', 'species_id', 'collection_date', 'lng', 'lat', 'quantity_kg'
+    ).order_by()
+
+    batch_ids, collectors, species, times, lngs, lats, quantities = [], [], [], [], [], [], []
+    for batch_id, collector_id, species_id, collected, lng, lat, quantity in rows.iterator(chunk_size=5000):
+        batch_ids.append(batch_id)
+        collectors.append(collector_id)
+        species.append(species_id)
+        times.append(collected.timestamp())
+        lngs.append(lng)
+        lats.append(lat)
+        quantities.append(float(quantity))
+
+    return (
+        np.array(batch_ids, dtype=object),
+        np.array(collectors, dtype=np.int64),
+        np.array(species, dtype=np.int64),
+        np.array(times, dtype=np.float64),
+        np.array(lngs, dtype=np.float64),
+        np.array(lats, dtype=np.float64),
+        np.array(quantities, dtype=np.float64),
+    )
+
+def sweep_batch_anomalies():
+    """
+    Score every batch with vectorized NumPy passes and replace sweep flags.
+
+    Also refreshes the per-species quantity statistics used at ingest.
+    Returns the number of anomalies flagged.
+    """
+    batch_ids, collectors, species, times, lngs, lats, quantities = _load_batch_arrays()
+    anomalies = []
+
+    if len(batch_ids):
+        # Quantity outliers: z-score of log quantity within each species
+        log_qty = np.log(np.maximum(quantities, 1e-6))
+        species_ids, inverse, counts = np.unique(species, return_inverse=True, return_counts=True)
+        mean = np.bincount(inverse, weights=log_qty) / counts
+        std = np.sqrt(np.maximum(np.bincount(inverse, weights=log_qty ** 2) / counts - mean ** 2, 0))
+        safe_std = np.where(std > 0, std, np.inf)
+        zscores = (log_qty - mean[inverse]) / safe_std[inverse]
+        outliers = (np.abs(zscores) > settings.QUANTITY_Z_THRESHOLD) & (counts[inverse] >= settings.QUANTITY_MIN_SAMPLES)
+
+        for index in np.flatnonzero(outliers):
+            anomalies.append(BatchAnomaly(
+                batch_id=batch_ids[index],
+                anomaly_type='QUANTITY_OUTLIER',
+                score=float(abs(zscores[index])),
+                details={'zscore': round(float(zscores[index]), 2)},
+                detected_by='SWEEP',
+            ))
+
+        cache.set(SPECIES_QUANTITY_STATS_KEY, {
+            int(species_id): {'mean': float(mean[i]), 'std': float(std[i]), 'count': int(counts[i])}
+            for i, species_id in enumerate(species_ids)
+        }, timeout=None)
+
+        # Duplicates: compare each batch with its next neighbours in (collector, time) order
+        order = np.lexsort((times, collectors))
+        window_s = settings.DUPLICATE_WINDOW_HOURS * 3600
+        for k in range(1, settings.DUPLICATE_SWEEP_NEIGHBOURS + 1):
+            if k >= len(order):
+                break
+            earlier, later = order[:-k], order[k:]
+            delta_t = times[later] - times[earlier]
+            candidates = (collectors[later] == collectors[earlier]) & (delta_t <= window_s)
+            distances = _haversine_m(lngs[earlier], lats[earlier], lngs[later], lats[later])
+            duplicates = candidates & (distances <= settings.DUPLICATE_DISTANCE_METERS)
+
+            for index in np.flatnonzero(duplicates):
+                anomalies.append(BatchAnomaly(
+                    batch_id=batch_ids[later[index]],
+                    anomaly_type='DUPLICATE',
+                    related_batch_id=batch_ids[earlier[index]],
+                    score=float(1 - (delta_t[index] / window_s + distances[index] / settings.DUPLICATE_DISTANCE_METERS) / 2),
+                    details={'seconds_apart': int(delta_t[index]), 'meters_apart': round(float(distances[index]), 1)},
+                    detected_by='SWEEP',
+                ))
+
+    return replace_sweep_anomalies(('DUPLICATE', 'QUANTITY_OUTLIER'), anomalies)
+
+def replace_sweep_anomalies(anomaly_types, anomalies):
+    """Swap the unresolved sweep flags of the given types for a fresh set"""
+    # Do not re-raise flags a reviewer has already resolved
+    resolved = set(BatchAnomaly.objects.filter(
+        anomaly_type__in=anomaly_types, is_resolved=True
+    ).values_list('batch_id', 'anomaly_type', 'related_batch_id'))
+    anomalies = [
+        anomaly for anomaly in anomalies
+        if (anomaly.batch_id, anomaly.anomaly_type, anomaly.related_batch_id) not in resolved
+    ]
+
+    with transaction.atomic():
+        BatchAnomaly.objects.filter(
+            anomaly_type__in=anomaly_types, detected_by='SWEEP', is_resolved=False
+        ).delete()
+        BatchAnomaly.objects.bulk_create(anomalies, batch_size=1000)
+    return len(anomalies)
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import pre_migrate
+
+def create_trigram_extension(using, **kwargs):
+    """The gin_trgm_ops search indexes need pg_trgm before their tables are created"""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+class TraceabilityConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'traceability'
+
+    def ready(self):
+        import traceability.signals
+        pre_migrate.connect(create_trigram_extension, sender=self)
@@ -0,0 +1,67 @@
+from django.db import IntegrityError, transaction
+
+from .models import HerbSpecies, Collector, Batch
+from .ids import BATCH_ID_ATTEMPTS, batch_id_prefix, allocate_batch_ids
+from .anomalies import detect_bulk_anomalies
+from .search import refresh_batch_search_documents
+from .changes import record_changes
+from .tiles import invalidate_clusters, invalidate_tiles
+from . import timeline
+from blockchain.tasks import record_batches_on_blockchain
+
+def _ids(items, key):
+    return {
+        str(item[key]) for item in items
+        if isinstance(item, dict) and str(item.get(key, '')).isdigit()
+    }
+
+def preload_batch_relations(items):
+    """Species and collectors referenced by raw batch items, two queries in total"""
+    return {
+        HerbSpecies: HerbSpecies.objects.in_bulk(_ids(items, 'species')),
+        Collector: Collector.objects.select_related('user').in_bulk(_ids(items, 'collector')),
+    }
+
+def _assign_batch_ids(batches):
+    """One block of IDs per species/collector prefix in the upload"""
+    by_prefix = {}
+    for batch in batches:
+        prefix = batch_id_prefix(batch.species.name, batch.collector.collector_id)
+        by_prefix.setdefault(prefix, []).append(batch)
+    for prefix, group in by_prefix.items():
+        for batch, batch_id in zip(group, allocate_batch_ids(prefix, len(group))):
+            batch.batch_id = batch_id
+
+def bulk_create_batches(items):
+    """
+    Insert validated batch data with one bulk_create in one transaction.
+
+    bulk_create sends no signals, so the work of the Batch save handlers is
+    done here once for the whole upload: change log and timeline entries,
+    search documents, anomaly flags, map tile invalidation and a single
+    blockchain anchoring job. Returns the created batches, in input order,
+    and their anomalies.
+    """
+    batches = [Batch(**data) for data in items]
+    with transaction.atomic():
+        for attempt in range(BATCH_ID_ATTEMPTS):
+            _assign_batch_ids(batches)
+            batch_ids = [batch.batch_id for batch in batches]
+            try:
+                with transaction.atomic():
+                    Batch.objects.bulk_create(batches)
+                break
+            except IntegrityError:
+                # Another process was handed some of the same IDs; allocate a new block
+                if attempt == BATCH_ID_ATTEMPTS - 1 or not Batch.objects.filter(pk__in=batch_ids).exists():
+                    raise
+        record_changes('batch', batch_ids, 'CREATE')
+        timeline.record_collections(batches)
+        refresh_batch_search_documents(Batch.objects.filter(pk__in=batch_ids))
+        anomalies = detect_bulk_anomalies(batches)
+        transaction.on_commit(lambda: record_batches_on_blockchain.apply_async(args=[batch_ids]))
+
+    points = [batch.collection_location for batch in batches]
+    invalidate_clusters(points)
+    invalidate_tiles('collections', points)
+    return batches, anomalies
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+import time
+
+from .singleflight import batch_flight
+
+BATCH_VERSION_KEY = 'batch-version:{batch_id}'
+BATCH_DETAIL_KEY = 'batch-detail:{batch_id}:{version}'
+
+def _seed_version():
+    """Seed versions from the clock so a flushed cache never reissues an old ETag"""
+    return int(time.time() * 1000)
+
+def get_batch_version(batch_id):
+    """
+    Current cache version of a batch and everything rendered from it.
+
+    Keys are seeded for any requested ID, including ones the public verify
+    endpoints are probed with, so they expire after BATCH_VERSION_TIMEOUT.
+    """
+    key = BATCH_VERSION_KEY.format(batch_id=batch_id)
+    version = cache.get(key)
+    if version is None:
+        version = _seed_version()
+        if not cache.add(key, version, timeout=settings.BATCH_VERSION_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+def get_batch_versions(batch_ids):
+    """Current cache versions of several batches in one cache round-trip"""
+    keys = {BATCH_VERSION_KEY.format(batch_id=batch_id): batch_id for batch_id in batch_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, batch_id in keys.items():
+        if key not in found:
+            versions[batch_id] = get_batch_version(batch_id)
+    return versions
+
+def bump_batch_version(batch_id):
+    """
+    Invalidate every cached rendering of a batch.
+
+    Inside a transaction the version is bumped again once it commits: a
+    reader between the two bumps still sees the old rows and may cache them
+    under the first new version, which the second bump retires.
+    """
+    version = _bump(batch_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(batch_id))
+    return version
+
+def _bump(batch_id):
+    key = BATCH_VERSION_KEY.format(batch_id=batch_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _seed_version()
+        cache.set(key, version, timeout=settings.BATCH_VERSION_TIMEOUT)
+        return version
+
+def batch_etag(batch_id, version):
+    return f'"{batch_id}-{version}"'
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+def etag_matches(request, etag):
+    """Weak If-None-Match comparison, since compressed responses carry W/ ETags"""
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in etags or _opaque(etag) in {_opaque(tag) for tag in etags}
+
+def get_batch_detail(batch_id, version, builder):
+    """Rendered detail payload for a batch version, built once under concurrency"""
+    return batch_flight.get_or_build(
+        BATCH_DETAIL_KEY.format(batch_id=batch_id, version=version),
+        builder,
+        timeout=settings.VERIFICATION_CACHE_TIMEOUT
+    )
+
+def get_cached_batch_details(versions):
+    """Detail payloads already cached for {batch_id: version}, without building misses"""
+    keys = {
+        BATCH_DETAIL_KEY.format(batch_id=batch_id, version=version): batch_id
+        for batch_id, version in versions.items()
+    }
+    return {keys[key]: payload for key, payload in cache.get_many(keys).items()}
@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+import threading
+import time
+
+from .models import HerbSpecies
+
+SPECIES_VERSION_KEY = 'species-catalogue-version'
+
+# Species fields kept in the catalogue; the JSON property blobs stay in the database
+CATALOGUE_FIELDS = ('id', 'name', 'scientific_name', 'sanskrit_name', 'common_names', 'harvesting_season')
+
+def _name_variants(species):
+    names = [species['name'], species['scientific_name'], species['sanskrit_name']]
+    names.extend(name for name in species['common_names'] if isinstance(name, str))
+    return [name.strip() for name in names if name and name.strip()]
+
+def _index_keys(name):
+    """Normalized name plus each of its later words, so 'cherry' finds 'Winter Cherry'"""
+    words = name.casefold().split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+class SpeciesCatalogue:
+    """
+    Compact species rows and a sorted prefix index of every name variant.
+
+    Loaded once per process and reloaded only when the shared version key
+    changes, which is checked at most every SPECIES_CATALOGUE_CHECK_SECONDS.
+    Lookups and autocomplete are dictionary reads and a bisect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _load(self):
+        species = {}
+        entries = []
+        for row in HerbSpecies.objects.values(*CATALOGUE_FIELDS).order_by('name'):
+            species[row['id']] = row
+            for name in _name_variants(row):
+                entries.extend((key, row['id'], name) for key in _index_keys(name))
+        entries.sort()
+        return species, [entry[0] for entry in entries], entries
+
+    def _get_data(self, force=False):
+        now = time.monotonic()
+        data = self._data
+        if not force and data is not None and now - self._checked_at < settings.SPECIES_CATALOGUE_CHECK_SECONDS:
+            return data
+
+        with self._lock:
+            version = cache.get(SPECIES_VERSION_KEY)
+            if self._data is None or version != self._version:
+                self._data = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._data
+
+    def get(self, species_id):
+        """Compact species dict, or None if it does not exist"""
+        species = self._get_data()[0]
+        if species_id not in species:
+            # Created in another process since our last version check
+            species = self._get_data(force=True)[0]
+        return species.get(species_id)
+
+    def autocomplete(self, prefix, limit=10):
+        """Species with a name variant starting with prefix, with the matched name"""
+        species, keys, entries = self._get_data()
+        prefix = ' '.join(prefix.casefold().split())
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        for index in range(bisect_left(keys, prefix), len(keys)):
+            key, species_id, name = entries[index]
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            if species_id not in seen:
+                seen.add(species_id)
+                results.append({**species[species_id], 'matched_name': name})
+        return results
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+species_catalogue = SpeciesCatalogue()
+
+def bump_species_version():
+    """Reload the catalogue here now and in other processes on their next check"""
+    cache.set(SPECIES_VERSION_KEY, time.time_ns(), timeout=None)
+    species_catalogue.invalidate()
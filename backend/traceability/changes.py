@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FloatField, Func, Min
+from django.utils import timezone
+from datetime import timedelta
+import base64
+
+from .models import Batch, ProcessingEvent, QualityTest, ChangeLogEntry
+from blockchain.models import BlockchainTransaction
+
+def _point(field, function):
+    return Func(field, function=function, output_field=FloatField())
+
+# Synced models: model class and the compact columns sent to clients
+SYNC_MODELS = {
+    'batch': (Batch, {
+        'fields': ['batch_id', 'species_id', 'collector_id', 'collection_date', 'quantity_kg',
+                   'quality_grade', 'harvesting_method', 'status', 'blockchain_hash',
+                   'is_blockchain_verified', 'updated_at'],
+        'expressions': {
+            'lng': _point('collection_location', 'ST_X'),
+            'lat': _point('collection_location', 'ST_Y'),
+        },
+    }),
+    'processing_event': (ProcessingEvent, {
+        'fields': ['id', 'batch_id', 'event_type', 'event_date', 'facility_name', 'input_quantity_kg',
+                   'output_quantity_kg', 'blockchain_hash', 'is_blockchain_verified', 'updated_at'],
+    }),
+    'quality_test': (QualityTest, {
+        'fields': ['id', 'batch_id', 'test_type', 'test_date', 'testing_lab', 'pass_status',
+                   'certificate_number'],
+    }),
+    'blockchain_transaction': (BlockchainTransaction, {
+        'fields': ['id', 'transaction_hash', 'transaction_type', 'batch_id', 'status',
+                   'block_number', 'created_at', 'confirmed_at'],
+    }),
+}
+
+MODEL_NAMES = {model: name for name, (model, _) in SYNC_MODELS.items()}
+
+def record_change(instance, operation):
+    """Log a write to a synced model instance once its transaction commits"""
+    entry = ChangeLogEntry(model=MODEL_NAMES[type(instance)], object_id=str(instance.pk), operation=operation)
+    transaction.on_commit(entry.save)
+
+def record_changes(model_name, object_ids, operation):
+    """Log writes made by bulk_create or queryset updates, which send no signals"""
+    entries = [
+        ChangeLogEntry(model=model_name, object_id=str(object_id), operation=operation)
+        for object_id in object_ids
+    ]
+    transaction.on_commit(lambda: ChangeLogEntry.objects.bulk_create(entries))
+
+def encode_token(seq):
+    return base64.urlsafe_b64encode(f'v1:{seq}'.encode()).decode()
+
+def decode_token(token):
+    """Sequence of a sync token; raises ValueError when it is malformed"""
+    try:
+        version, seq = base64.urlsafe_b64decode(token.encode()).decode().split(':')
+    except Exception:
+        raise ValueError('Invalid sync token')
+    if version != 'v1' or not seq.isdigit():
+        raise ValueError('Invalid sync token')
+    return int(seq)
+
+class ResyncRequired(Exception):
+    """The token is older than the retained change log"""
+
+def change_log_horizon():
+    """Highest pruned sequence: tokens below it have missed entries"""
+    oldest = ChangeLogEntry.objects.aggregate(oldest=Min('id'))['oldest']
+    return oldest - 1 if oldest else 0
+
+def _load_rows(model_name, object_ids):
+    model, spec = SYNC_MODELS[model_name]
+    pk_name = model._meta.pk.name
+    rows = model.objects.filter(pk__in=object_ids).values(
+        *spec['fields'], **spec.get('expressions', {})
+    )
+    return {str(row[pk_name]): row for row in rows}
+
+def get_changes(since, limit, model_names=None):
+    """
+    Changes logged after sequence ``since``, at most limit entries.
+
+    Reads an index range on the change sequence, keeps the last entry per
+    object and loads current rows with one values() query per model. Objects
+    that no longer exist come back as tombstones. Entries are written when
+    their transaction commits, and those younger than
+    CHANGE_FEED_SETTLE_SECONDS are left for the next poll, so a concurrent
+    commit that took a lower sequence is not skipped. A ``since`` of None
+    starts at the oldest retained entry. Returns
+    ``(changes, last_seq, has_more)``.
+    """
+    horizon = change_log_horizon()
+    if since is None:
+        since = horizon
+    elif since < horizon:
+        raise ResyncRequired()
+
+    entries = ChangeLogEntry.objects.filter(
+        id__gt=since,
+        changed_at__lte=timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS),
+    )
+    if model_names:
+        entries = entries.filter(model__in=model_names)
+    entries = list(entries.order_by('id').values_list('id', 'model', 'object_id', 'operation')[:limit + 1])
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return [], since, False
+
+    latest = {}
+    for seq, model_name, object_id, operation in entries:
+        latest.pop((model_name, object_id), None)
+        latest[(model_name, object_id)] = (seq, operation)
+
+    object_ids = {}
+    for model_name, object_id in latest:
+        object_ids.setdefault(model_name, []).append(object_id)
+    rows = {
+        model_name: _load_rows(model_name, ids) for model_name, ids in object_ids.items()
+    }
+
+    changes = []
+    for (model_name, object_id), (seq, operation) in latest.items():
+        row = rows[model_name].get(object_id)
+        if row is None:
+            changes.append({'model': model_name, 'id': object_id, 'op': 'delete'})
+        else:
+            changes.append({'model': model_name, 'id': object_id, 'op': 'upsert', 'data': row})
+    return changes, entries[-1][0], has_more
+
+def prune_change_log():
+    """
+    Drop entries older than CHANGE_LOG_RETENTION_DAYS; older tokens must resync.
+
+    The newest entry is always kept, since the horizon is derived from the
+    oldest retained sequence.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS)
+    newest = ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first()
+    if newest is None:
+        return 0
+    return ChangeLogEntry.objects.filter(changed_at__lt=cutoff, id__lt=newest).delete()[0]
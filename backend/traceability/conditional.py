@@ -0,0 +1,146 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, IntegerField, Max, Sum, TextField, Value
+from django.db.models.functions import MD5, Cast, Coalesce, Concat
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+import hashlib
+
+from .sparse import DynamicFieldsMixin
+
+def resource_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+
+def _lookup_model(model, lookup):
+    for name in lookup.split('__'):
+        model = model._meta.get_field(name).related_model
+    return model
+
+def _rendered_columns(serializer, lookup, model):
+    """Names of the model's own columns the serializer renders at a lookup, or None when unknown"""
+    field = serializer
+    for part in lookup.split('__'):
+        fields = getattr(getattr(field, 'child', field), 'fields', None)
+        if fields is None:
+            return None
+        field = next((child for child in fields.values() if child.source == part), None)
+        if field is None:
+            return None
+    fields = getattr(getattr(field, 'child', field), 'fields', None)
+    if fields is None:
+        return None
+
+    names = set()
+    for child in fields.values():
+        try:
+            model_field = model._meta.get_field(child.source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.is_relation:
+            names.add(model_field.name)
+    return sorted(names)
+
+def _rows_digest(lookup, columns):
+    """MD5 over the rendered columns of every related row, for models without a version column"""
+    row = Concat(Value(''), *(
+        part for name in columns
+        for part in (Coalesce(Cast(f'{lookup}__{name}', TextField()), Value('')), Value('|'))
+    ), output_field=TextField())
+    return MD5(StringAgg(row, delimiter=',', ordering=f'{lookup}__pk'))
+
+class ConditionalGetMixin:
+    """
+    ETag on retrieve and list, plus Last-Modified on retrieve, checked
+    before serialization.
+
+    Validators come from ``version_field`` (an indexed ``updated_at``): one
+    values_list() row for a detail and one MAX/COUNT aggregate over the
+    filtered queryset for a list, so a 304 never loads instances or runs a
+    serializer. Related rows the selected fields render (nested users,
+    specializations, counts, catalogue species) add one aggregate per
+    relation, so edits, additions and removals there change the ETag too;
+    related models without ``version_field`` (users) are digested from the
+    columns rendered. Lists send no Last-Modified, since MAX(updated_at)
+    cannot show a deleted row. The query string and renderer are part of
+    the ETag because ``?fields=``, cursors and formats change the body.
+    Writes done with queryset updates or ``update_fields`` must set
+    ``updated_at`` themselves.
+    """
+    version_field = 'updated_at'
+
+    def _related_validators(self, queryset):
+        """MAX(version) or a column digest, COUNT and a primary key checksum of each rendered relation"""
+        serializer = self.get_serializer()
+        if not isinstance(serializer, DynamicFieldsMixin):
+            return ()
+
+        rows = queryset.model._default_manager.filter(pk__in=queryset.order_by().values('pk'))
+        validators = []
+        for lookup in sorted(serializer.get_related_lookups()):
+            model = _lookup_model(queryset.model, lookup)
+            aggregates = {'count': Count(lookup)}
+            if any(field.name == self.version_field for field in model._meta.concrete_fields):
+                aggregates['last'] = Max(f'{lookup}__{self.version_field}')
+            else:
+                columns = _rendered_columns(serializer, lookup, model)
+                if columns:
+                    aggregates['digest'] = _rows_digest(lookup, columns)
+            if isinstance(model._meta.pk, IntegerField):
+                # Catches swapped members, which keep the count and may keep the MAX
+                aggregates['checksum'] = Sum(f'{lookup}__pk')
+            state = rows.aggregate(**aggregates)
+            validators.append(lookup)
+            validators.extend(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for _, value in sorted(state.items())
+            )
+        return tuple(validators)
+
+    def _conditional_response(self, request, validators, last_modified, render):
+        etag = resource_etag(
+            type(self).__name__, *validators, request.accepted_renderer.format, request.GET.urlencode()
+        )
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        retrieve = super().retrieve
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        last_modified = (
+            self.get_queryset().prefetch_related(None)
+            .filter(**{self.lookup_field: lookup})
+            .values_list(self.version_field, flat=True)
+            .first()
+        )
+        if last_modified is None:
+            # Missing, or not visible to this user: let retrieve answer 404
+            return retrieve(request, *args, **kwargs)
+
+        related = self._related_validators(self.get_queryset().filter(**{self.lookup_field: lookup}))
+        return self._conditional_response(
+            request, (lookup, last_modified.isoformat(), *related), last_modified,
+            lambda: retrieve(request, *args, **kwargs)
+        )
+
+    def list(self, request, *args, **kwargs):
+        render_list = super().list
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.order_by().aggregate(
+            last_modified=Max(self.version_field), count=Count('pk')
+        )
+        last_modified = state['last_modified']
+        related = self._related_validators(queryset)
+
+        return self._conditional_response(
+            request, (state['count'], last_modified.isoformat() if last_modified else '', *related),
+            None, lambda: render_list(request, *args, **kwargs)
+        )
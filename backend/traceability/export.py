@@ -0,0 +1,227 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FloatField, Func
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
+import csv
+import io
+import json
+import zlib
+
+from .models import Batch, ProcessingEvent, QualityTest
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'geojsonseq': ('application/geo+json-seq', 'geojsons'),
+}
+
+# Exported batch columns and the values() lookup or expression each is read from
+BATCH_EXPORT_FIELDS = {
+    'batch_id': 'batch_id',
+    'species': 'species_id',
+    'species_name': 'species__name',
+    'collector': 'collector__collector_id',
+    'collection_date': 'collection_date',
+    'longitude': Func('collection_location', function='ST_X', output_field=FloatField()),
+    'latitude': Func('collection_location', function='ST_Y', output_field=FloatField()),
+    'collection_area_hectares': 'collection_area_hectares',
+    'altitude_meters': 'altitude_meters',
+    'quantity_kg': 'quantity_kg',
+    'moisture_content': 'moisture_content',
+    'quality_grade': 'quality_grade',
+    'harvesting_method': 'harvesting_method',
+    'regeneration_time_months': 'regeneration_time_months',
+    'soil_health_score': 'soil_health_score',
+    'status': 'status',
+    'blockchain_hash': 'blockchain_hash',
+    'is_blockchain_verified': 'is_blockchain_verified',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+PROCESSING_EVENT_EXPORT_FIELDS = [
+    'id', 'event_type', 'event_date', 'facility_name', 'temperature_celsius', 'humidity_percent',
+    'duration_hours', 'input_quantity_kg', 'output_quantity_kg', 'yield_percentage',
+    'blockchain_hash', 'is_blockchain_verified',
+]
+
+QUALITY_TEST_EXPORT_FIELDS = [
+    'id', 'test_type', 'test_date', 'testing_lab', 'lab_certification', 'test_results',
+    'pass_status', 'certificate_number',
+]
+
+# Related rows exported per batch: model and columns
+RELATED_EXPORTS = {
+    'processing_events': (ProcessingEvent, PROCESSING_EVENT_EXPORT_FIELDS),
+    'quality_tests': (QualityTest, QUALITY_TEST_EXPORT_FIELDS),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+def _parse_bound(value, end_of_day=False):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def parse_export_options(params):
+    """Validate export query parameters; raises ValueError with a client-facing message"""
+    output = params.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f'output must be one of {", ".join(EXPORT_FORMATS)}')
+
+    available = list(BATCH_EXPORT_FIELDS) + list(RELATED_EXPORTS)
+    fields = [field for field in (params.get('fields') or '').split(',') if field] or available
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+
+    species = [value for value in (params.get('species') or '').split(',') if value]
+    if not all(value.isdigit() for value in species):
+        raise ValueError('species must be a comma separated list of IDs')
+
+    return {
+        'output': output,
+        'fields': fields,
+        'species': [int(value) for value in species],
+        'since': _parse_bound(params['since']) if params.get('since') else None,
+        'until': _parse_bound(params['until'], end_of_day=True) if params.get('until') else None,
+    }
+
+def export_queryset(fields, species=None, since=None, until=None):
+    """values() rows of the selected batch columns, in batch_id order"""
+    columns = [field for field in fields if field in BATCH_EXPORT_FIELDS]
+    if 'batch_id' not in columns:
+        columns.insert(0, 'batch_id')
+
+    queryset = Batch.objects.all()
+    if species:
+        queryset = queryset.filter(species_id__in=species)
+    if since:
+        queryset = queryset.filter(collection_date__gte=since)
+    if until:
+        queryset = queryset.filter(collection_date__lte=until)
+
+    lookups = [BATCH_EXPORT_FIELDS[name] for name in columns if isinstance(BATCH_EXPORT_FIELDS[name], str)]
+    expressions = {name: BATCH_EXPORT_FIELDS[name] for name in columns if not isinstance(BATCH_EXPORT_FIELDS[name], str)}
+    return queryset.values(*lookups, **expressions).order_by('batch_id')
+
+def _attach_related(rows, related):
+    """Add related rows to a chunk of batches with one query per relation"""
+    batch_ids = [row['batch_id'] for row in rows]
+    for name in related:
+        model, columns = RELATED_EXPORTS[name]
+        grouped = {}
+        for child in model.objects.filter(batch_id__in=batch_ids).values('batch_id', *columns).order_by('batch_id', 'id'):
+            grouped.setdefault(child.pop('batch_id'), []).append(child)
+        for row in rows:
+            row[name] = grouped.get(row['batch_id'], [])
+
+def iter_export_rows(fields, species=None, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield export rows as dicts, holding at most one chunk in memory.
+
+    Batches are read through a server-side cursor; related events and tests
+    are fetched for each chunk of chunk_size batches.
+    """
+    queryset = export_queryset(fields, species, since, until)
+    related = [field for field in fields if field in RELATED_EXPORTS]
+    renames = [
+        (lookup, name) for name, lookup in BATCH_EXPORT_FIELDS.items()
+        if name in fields and isinstance(lookup, str) and lookup != name
+    ]
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        for lookup, name in renames:
+            row[name] = row.pop(lookup)
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            _attach_related(chunk, related)
+            yield from chunk
+            chunk = []
+    if chunk:
+        _attach_related(chunk, related)
+        yield from chunk
+
+def _json(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield _json({field: row[field] for field in fields}) + '\n'
+
+def _geojsonseq_lines(rows, fields):
+    # RFC 8142: each feature is prefixed with a record separator
+    properties = [field for field in fields if field not in ('longitude', 'latitude')]
+    for row in rows:
+        yield '\x1e' + _json({
+            'type': 'Feature',
+            'id': row['batch_id'],
+            'geometry': {'type': 'Point', 'coordinates': [row['longitude'], row['latitude']]},
+            'properties': {field: row[field] for field in properties},
+        }) + '\n'
+
+def _csv_lines(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(fields)
+    for row in rows:
+        yield line([
+            _json(row[field]) if field in RELATED_EXPORTS else row[field]
+            for field in fields
+        ])
+
+def _buffered(lines, size=64 * 1024):
+    """Join small lines into larger writes"""
+    parts = []
+    length = 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts).encode()
+            parts = []
+            length = 0
+    if parts:
+        yield ''.join(parts).encode()
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_export(output, fields, species=None, since=None, until=None, gzip=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encoded export as an iterator of byte chunks"""
+    if output == 'geojsonseq':
+        # Coordinates become the feature geometry
+        query_fields = list(dict.fromkeys(fields + ['longitude', 'latitude']))
+    else:
+        query_fields = fields
+
+    rows = iter_export_rows(query_fields, species, since, until, chunk_size)
+    encoders = {'ndjson': _ndjson_lines, 'csv': _csv_lines, 'geojsonseq': _geojsonseq_lines}
+    chunks = _buffered(encoders[output](rows, fields))
+    return _gzipped(chunks) if gzip else chunks
+
+def export_filename(output, gzip=False):
+    extension = EXPORT_FORMATS[output][1]
+    name = f'batches-{timezone.now():%Y%m%d%H%M%S}.{extension}'
+    return f'{name}.gz' if gzip else name
@@ -0,0 +1,179 @@
+from django.conf import settings
+from django.contrib.gis.db.models import PointField
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import FloatField, Func
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework_gis.serializers import GeoFeatureModelSerializer
+from operator import itemgetter
+
+from herbtrace.pagination import KeysetPagination
+from .sparse import SPARSE_PARAMS
+from .geojson import point_geometry
+
+_encoders = {}
+
+def _point(field, function):
+    return Func(field, function=function, output_field=FloatField())
+
+def _column_reader(column, convert=None):
+    get = itemgetter(column)
+    if convert is None:
+        return get
+
+    def read(row):
+        value = get(row)
+        return None if value is None else convert(value)
+    return read
+
+def _method_reader(method, columns):
+    get = itemgetter(*columns)
+    if len(columns) == 1:
+        return lambda row: method(get(row))
+    return lambda row: method(*get(row))
+
+class RowEncoder:
+    """
+    A serializer's list representation, compiled to read values() rows.
+
+    Each readable field becomes a reader over one or more columns:
+
+    - model columns go through the DRF field's ``to_representation``
+    - primary key related fields read the foreign key column as is
+    - fields named in Meta ``fast_fields`` (name -> columns) call the
+      serializer's ``fast_<name>(*values)``, which the regular field should
+      share so both paths stay in step
+    - the GeoJSON geometry of a GeoFeatureModelSerializer is built from
+      ST_X/ST_Y of its point field, rounded like PointGeometryField
+
+    Anything else raises ImproperlyConfigured when the encoder is compiled.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        meta = serializer.Meta
+        self.model = meta.model
+        self.columns = set()
+        self.expressions = {}
+        fast_fields = getattr(meta, 'fast_fields', {})
+
+        self.is_geo = isinstance(serializer, GeoFeatureModelSerializer)
+        skip = set()
+        if self.is_geo:
+            if getattr(meta, 'auto_bbox', False) or getattr(meta, 'bbox_geo_field', None):
+                raise ImproperlyConfigured('The fast path does not encode feature bounding boxes')
+            skip = {meta.geo_field, meta.id_field}
+            self.read_geometry = self._compile_geometry(meta.geo_field)
+            self.read_id = meta.id_field and self._compile(serializer, serializer.fields[meta.id_field], fast_fields)
+
+        self.readers = [
+            (name, self._compile(serializer, field, fast_fields))
+            for name, field in serializer.fields.items()
+            if not field.write_only and name not in skip
+        ]
+
+    def _compile(self, serializer, field, fast_fields):
+        name = field.field_name
+        if name in fast_fields:
+            columns = list(fast_fields[name])
+            self.columns.update(columns)
+            return _method_reader(getattr(serializer, f'fast_{name}'), columns)
+
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f'{type(serializer).__name__}.{name} has no model column; declare it in Meta.fast_fields'
+            )
+        if model_field.is_relation:
+            if not isinstance(field, PrimaryKeyRelatedField) or not model_field.concrete:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{name} is a nested relation; declare it in Meta.fast_fields'
+                )
+            self.columns.add(model_field.attname)
+            return itemgetter(model_field.attname)
+
+        self.columns.add(model_field.name)
+        return _column_reader(model_field.name, field.to_representation)
+
+    def _compile_geometry(self, geo_field):
+        if not isinstance(self.model._meta.get_field(geo_field), PointField):
+            raise ImproperlyConfigured(f'The fast path only encodes point geometries, not {geo_field}')
+        self.expressions = {
+            'geometry_x': _point(geo_field, 'ST_X'),
+            'geometry_y': _point(geo_field, 'ST_Y'),
+        }
+        get = itemgetter('geometry_x', 'geometry_y')
+
+        def read(row):
+            x, y = get(row)
+            if x is None:
+                return None
+            return point_geometry(x, y)
+        return read
+
+    def values(self, queryset, extra_columns=()):
+        """values() rows with every column the readers and the paginator need"""
+        columns = set(self.columns) | set(queryset.query.annotations)
+        for name in extra_columns:
+            try:
+                if name != 'pk':
+                    self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            columns.add(name)
+        return queryset.prefetch_related(None).values(*columns, **self.expressions)
+
+    def encode(self, row):
+        properties = {name: read(row) for name, read in self.readers}
+        if not self.is_geo:
+            return properties
+        feature = {}
+        if self.read_id:
+            feature['id'] = self.read_id(row)
+        feature['type'] = 'Feature'
+        feature['geometry'] = self.read_geometry(row)
+        feature['properties'] = properties
+        return feature
+
+    def encode_many(self, rows):
+        encoded = [self.encode(row) for row in rows]
+        if self.is_geo:
+            return {'type': 'FeatureCollection', 'features': encoded}
+        return encoded
+
+def get_row_encoder(serializer_class):
+    """Compiled once per serializer class and process"""
+    encoder = _encoders.get(serializer_class)
+    if encoder is None:
+        encoder = _encoders[serializer_class] = RowEncoder(serializer_class)
+    return encoder
+
+class FastListMixin:
+    """
+    Serve list requests from values() rows when FAST_LIST_SERIALIZATION is on.
+
+    Only the default shape is served this way; ``?fields=`` and ``?expand=``
+    requests go through the serializer. Filtering, ordering and pagination
+    are unchanged, and cursor pagination reads its position from the row.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZATION or SPARSE_PARAMS & set(request.query_params):
+            return super().list(request, *args, **kwargs)
+
+        encoder = get_row_encoder(self.get_serializer_class())
+        ordering = [
+            *(getattr(self, 'ordering', None) or ()),
+            *(getattr(self, 'ordering_fields', None) or ()),
+            *KeysetPagination.ordering,
+        ]
+        rows = encoder.values(
+            self.filter_queryset(self.get_queryset()),
+            extra_columns={name.lstrip('-') for name in ordering},
+        )
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(encoder.encode_many(page))
+        return Response(encoder.encode_many(rows))
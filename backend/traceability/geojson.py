@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.gis.db.models import PointField
+from rest_framework_gis.fields import GeometryField
+from rest_framework_gis.serializers import GeoFeatureModelSerializer
+
+def point_geometry(x, y):
+    """GeoJSON point with coordinates rounded to GEOJSON_COORDINATE_PRECISION decimals"""
+    precision = settings.GEOJSON_COORDINATE_PRECISION
+    return {'type': 'Point', 'coordinates': [round(x, precision), round(y, precision)]}
+
+class PointGeometryField(GeometryField):
+    """Builds point GeoJSON from x/y instead of a GDAL export and json.loads round-trip"""
+
+    def to_representation(self, value):
+        if value is None or isinstance(value, dict) or value.geom_type != 'Point' or value.empty:
+            return super().to_representation(value)
+        return point_geometry(value.x, value.y)
+
+class GeoFeatureSerializer(GeoFeatureModelSerializer):
+    """GeoFeatureModelSerializer that renders point fields with PointGeometryField"""
+    serializer_field_mapping = {
+        **GeoFeatureModelSerializer.serializer_field_mapping,
+        PointField: PointGeometryField,
+    }
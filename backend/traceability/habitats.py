@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+import threading
+import time
+
+from .models import Batch, BatchAnomaly, SpeciesHabitat
+from .anomalies import replace_sweep_anomalies
+
+HABITAT_VERSION_KEY = 'species-habitats-version'
+
+class HabitatRegistry:
+    """
+    Prepared habitat geometries per species, cached in-process.
+
+    Geometries are loaded once and reloaded only when the shared version key
+    changes, which is checked at most every HABITAT_VERSION_CHECK_SECONDS, so
+    a containment check is a GEOS call against a prepared geometry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prepared = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _load(self):
+        areas = {}
+        for species_id, area in SpeciesHabitat.objects.values_list('species_id', 'area'):
+            areas[species_id] = areas[species_id].union(area) if species_id in areas else area
+        return {species_id: area.prepared for species_id, area in areas.items()}
+
+    def _get_prepared(self):
+        now = time.monotonic()
+        prepared = self._prepared
+        if prepared is not None and now - self._checked_at < settings.HABITAT_VERSION_CHECK_SECONDS:
+            return prepared
+
+        with self._lock:
+            version = cache.get(HABITAT_VERSION_KEY)
+            if self._prepared is None or version != self._version:
+                self._prepared = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._prepared
+
+    def is_within_habitat(self, species_id, point):
+        """None when the species has no habitat data, otherwise whether it covers point"""
+        prepared = self._get_prepared().get(species_id)
+        if prepared is None:
+            return None
+        return prepared.covers(point)
+
+    def invalidate(self):
+        with self._lock:
+            self._prepared = None
+
+habitat_registry = HabitatRegistry()
+
+def bump_habitat_version():
+    """Reload habitat geometries here now and in other processes on their next check"""
+    cache.set(HABITAT_VERSION_KEY, time.time_ns(), timeout=None)
+    habitat_registry.invalidate()
+
+def find_out_of_habitat_batches():
+    """Batches of species with habitat data collected outside all of its habitats"""
+    habitats = SpeciesHabitat.objects.filter(species=OuterRef('species'))
+    return Batch.objects.filter(
+        Exists(habitats)
+    ).exclude(
+        Exists(habitats.filter(area__covers=OuterRef('collection_location')))
+    )
+
+def flag_out_of_habitat_batches():
+    """Flag historical batches collected outside their species habitat"""
+    anomalies = [
+        BatchAnomaly(
+            batch_id=batch_id,
+            anomaly_type='OUT_OF_HABITAT',
+            score=1.0,
+            detected_by='SWEEP',
+        )
+        for batch_id in find_out_of_habitat_batches().values_list('batch_id', flat=True).iterator()
+    ]
+    return replace_sweep_anomalies(('OUT_OF_HABITAT',), anomalies)
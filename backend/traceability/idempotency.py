@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework import status
+from rest_framework.response import Response
+import hashlib
+import json
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+def request_fingerprint(request):
+    """Hash of what a retry must repeat exactly: method, path and body"""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method}\n{request.path}\n{body}'.encode()).hexdigest()
+
+def _replay(stored, fingerprint):
+    if stored.request_fingerprint != fingerprint:
+        return Response(
+            {'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(stored.response_body, status=stored.status_code, headers={REPLAYED_HEADER: 'true'})
+
+def _claim(user, key, fingerprint):
+    """
+    Insert the in-progress row for a key, or return the row already there.
+
+    The unique (user, key) constraint makes the insert the lock, so it holds
+    across every worker and host. Expired rows, including claims left by a
+    request that died, are deleted first so the key can be reused.
+    """
+    now = timezone.now()
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, request_fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            ), None
+    except IntegrityError:
+        return None, IdempotencyKey.objects.filter(user=user, key=key).first()
+
+def idempotent_response(request, handler):
+    """
+    Run handler once per Idempotency-Key and replay its response on retries.
+
+    Responses below 500 are stored for IDEMPOTENCY_KEY_TTL_HOURS. The first
+    request claims the key by inserting its IdempotencyKey row before running
+    the handler, so a retry that arrives while it is still running gets 409
+    instead of writing a second row.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key or not request.user.is_authenticated:
+        return handler()
+    if len(key) > 255:
+        return Response({'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'},
+                      status=status.HTTP_400_BAD_REQUEST)
+
+    fingerprint = request_fingerprint(request)
+    claim, stored = _claim(request.user, key, fingerprint)
+    if claim is None:
+        if stored is not None and stored.status_code is not None:
+            return _replay(stored, fingerprint)
+        return Response({'error': f'A request with this {IDEMPOTENCY_HEADER} is in progress'},
+                      status=status.HTTP_409_CONFLICT)
+
+    try:
+        response = handler()
+    except Exception:
+        claim.delete()
+        raise
+    if response.status_code >= 500:
+        # Let the client retry with the same key
+        claim.delete()
+        return response
+
+    claim.status_code = response.status_code
+    claim.response_body = response.data
+    claim.expires_at = timezone.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    claim.save(update_fields=['status_code', 'response_body', 'expires_at'])
+    return response
+
+class IdempotentCreateMixin:
+    """Honour the Idempotency-Key header on create, so retried POSTs write once"""
+
+    def create(self, request, *args, **kwargs):
+        create = super().create
+        return idempotent_response(request, lambda: create(request, *args, **kwargs))
+
+def prune_idempotency_keys():
+    """Delete stored responses past their TTL"""
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+
+BATCH_SEQUENCE_KEY = 'batch-id-seq:{prefix}:{stamp}'
+
+# Per-second sequences are only needed while that second can still be allocated
+SEQUENCE_TIMEOUT = 300
+
+# Three sequence digits keep IDs fixed width, so they sort by time
+SEQUENCE_LIMIT = 1000
+
+# Inserts that clash with an existing batch ID retry with freshly allocated IDs
+BATCH_ID_ATTEMPTS = 5
+
+def batch_id_prefix(species_name, collector_id):
+    """HT + first three letters of the species + last three characters of the collector ID"""
+    return f"HT{species_name[:3].upper()}{collector_id[-3:]}"
+
+def _reserve(key, count):
+    """Add count to a shared counter and return the first reserved value"""
+    for _ in range(3):
+        cache.add(key, 0, timeout=SEQUENCE_TIMEOUT)
+        try:
+            return cache.incr(key, count) - count
+        except ValueError:
+            # Expired between add and incr
+            continue
+    raise RuntimeError(f'Could not reserve batch IDs for {key}')
+
+def allocate_batch_ids(prefix, count=1, now=None):
+    """
+    Reserve count batch IDs ``{prefix}{YYYYMMDDHHMMSS}{seq:03d}``.
+
+    The sequence is a per-(prefix, second) counter in the cache, so a block
+    of IDs costs one incr and no database round-trip. When a second runs out
+    of sequence numbers the rest of the block spills into the following
+    seconds, which keeps IDs ordered by time. IDs are only distinct among
+    processes sharing the cache, and a culled counter restarts, so callers
+    must insert with force_insert and retry on a primary key clash.
+    """
+    moment = (now or timezone.now()).replace(microsecond=0)
+    ids = []
+    while len(ids) < count:
+        stamp = moment.strftime('%Y%m%d%H%M%S')
+        wanted = count - len(ids)
+        start = _reserve(BATCH_SEQUENCE_KEY.format(prefix=prefix, stamp=stamp), wanted)
+        end = min(start + wanted, SEQUENCE_LIMIT)
+        ids.extend(f'{prefix}{stamp}{seq:03d}' for seq in range(start, end))
+        moment += timedelta(seconds=1)
+    return ids
+
+def allocate_batch_id(species_name, collector_id):
+    return allocate_batch_ids(batch_id_prefix(species_name, collector_id))[0]
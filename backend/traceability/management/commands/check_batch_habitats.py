@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from traceability.habitats import flag_out_of_habitat_batches
+
+class Command(BaseCommand):
+    help = 'Flag batches collected outside the habitat polygons of their species'
+
+    def handle(self, *args, **options):
+        flagged = flag_out_of_habitat_batches()
+        self.stdout.write(self.style.SUCCESS(f'Flagged {flagged} batches outside species habitat'))
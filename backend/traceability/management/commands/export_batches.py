@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from traceability.export import EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, parse_export_options, stream_export
+import sys
+
+class Command(BaseCommand):
+    help = 'Stream batches with their processing events and quality tests to a file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='output', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--fields', default='', help='Comma separated columns, all by default')
+        parser.add_argument('--species', default='', help='Comma separated species IDs')
+        parser.add_argument('--since', default='', help='Collected on or after this date')
+        parser.add_argument('--until', default='', help='Collected on or before this date')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--file', default='-', help='Output path, stdout by default')
+
+    def handle(self, *args, **options):
+        try:
+            export_options = parse_export_options(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = stream_export(gzip=options['gzip'], chunk_size=options['chunk_size'], **export_options)
+        if options['file'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        written = 0
+        with open(options['file'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Wrote {written} bytes to {options["file"]}'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from traceability.models import Batch, Collector
+from traceability.search import refresh_batch_search_documents, refresh_collector_search_documents
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search documents of collectors and batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def _refresh(self, model, refresh, chunk_size):
+        pks = model.objects.order_by('pk').values_list('pk', flat=True)
+        chunk = []
+        updated = 0
+        for pk in pks.iterator(chunk_size=chunk_size):
+            chunk.append(pk)
+            if len(chunk) == chunk_size:
+                updated += refresh(model.objects.filter(pk__in=chunk))
+                chunk = []
+        if chunk:
+            updated += refresh(model.objects.filter(pk__in=chunk))
+        return updated
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        collectors = self._refresh(Collector, refresh_collector_search_documents, chunk_size)
+        batches = self._refresh(Batch, refresh_batch_search_documents, chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search documents of {collectors} collectors and {batches} batches'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from traceability.models import Batch
+from traceability.timeline import rebuild_timeline
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized supply chain timelines from batch history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('batch_ids', nargs='*', help='Only rebuild these batches')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batches = Batch.objects.select_related('species', 'collector__user')
+        if options['batch_ids']:
+            batches = batches.filter(batch_id__in=options['batch_ids'])
+
+        rebuilt = 0
+        entries = 0
+        for batch in batches.iterator(chunk_size=options['chunk_size']):
+            entries += rebuild_timeline(batch)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} timelines ({entries} entries)'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from traceability.anomalies import sweep_batch_anomalies
+
+class Command(BaseCommand):
+    help = 'Score all batches for likely duplicates and out-of-range quantities'
+
+    def handle(self, *args, **options):
+        flagged = sweep_batch_anomalies()
+        self.stdout.write(self.style.SUCCESS(f'Flagged {flagged} batch anomalies'))
@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
-from datetime import datetime
+
+from .ids import BATCH_ID_ATTEMPTS, allocate_batch_id
 
 class HerbSpecies(models.Model):
     """Ayurvedic herb species master data"""
@@ -15,14 +19,34 @@ class HerbSpecies(models.Model):
     harvesting_season = models.CharField(max_length=100, blank=True)
     quality_parameters = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name_plural = "Herb Species"
+        indexes = [
+            GinIndex(fields=['name'], name='species_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['scientific_name'], name='species_scientific_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['sanskrit_name'], name='species_sanskrit_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.scientific_name})"
 
+class SpeciesHabitat(models.Model):
+    """Known habitat range of a species, used to validate collection locations"""
+    species = models.ForeignKey(HerbSpecies, on_delete=models.CASCADE, related_name='habitats')
+    name = models.CharField(max_length=200, blank=True)
+    area = gis_models.MultiPolygonField()
+    source = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Species Habitats"
+
+    def __str__(self):
+        return f"{self.species.name} - {self.name}"
+
 class Collector(models.Model):
     """Herb collectors/farmers profile"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -42,8 +66,16 @@ class Collector(models.Model):
     experience_years = models.PositiveIntegerField(default=0)
     specializations = models.ManyToManyField(HerbSpecies, blank=True)
     is_verified = models.BooleanField(default=False)
+    search_document = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            GinIndex(fields=['collector_id'], name='collector_id_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['search_document'], name='collector_search_idx'),
+        ]
 
     def __str__(self):
         return f"{self.collector_id} - {self.user.get_full_name()}"
@@ -113,25 +145,42 @@ class Batch(models.Model):
     # Media
     collection_photos = models.JSONField(default=list, blank=True)
     quality_certificates = models.JSONField(default=list, blank=True)
+
+    # Batch ID, species names and collector, maintained on write
+    search_document = SearchVectorField(null=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-batch_id']),
+            models.Index(fields=['collector', 'collection_date']),
+            GinIndex(fields=['batch_id'], name='batch_id_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['search_document'], name='batch_search_idx'),
+        ]
 
     def __str__(self):
         return f"Batch {self.batch_id} - {self.species.name}"
 
     def save(self, *args, **kwargs):
-        if not self.batch_id:
-            # Generate unique batch ID
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            species_code = self.species.name[:3].upper()
-            collector_code = self.collector.collector_id[-3:]
-            self.batch_id = f"HT{species_code}{collector_code}{timestamp}"
-        super().save(*args, **kwargs)
+        if self.batch_id:
+            return super().save(*args, **kwargs)
+        
+        # A preset primary key would UPDATE an existing row, so insert explicitly
+        # and take a fresh ID if another process was handed the same one
+        kwargs['force_insert'] = True
+        for attempt in range(BATCH_ID_ATTEMPTS):
+            self.batch_id = allocate_batch_id(self.species.name, self.collector.collector_id)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == BATCH_ID_ATTEMPTS - 1 or not Batch.objects.filter(pk=self.batch_id).exists():
+                    self.batch_id = ''
+                    raise
 
 class ProcessingEvent(models.Model):
     """Processing events in the supply chain"""
@@ -175,10 +224,14 @@ class ProcessingEvent(models.Model):
     is_blockchain_verified = models.BooleanField(default=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['event_date']
+        indexes = [
+            models.Index(fields=['-event_date', '-id']),
+            models.Index(fields=['batch', 'event_date', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.event_type} - {self.batch.batch_id} on {self.event_date.date()}"
@@ -215,6 +268,12 @@ class QualityTest(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-test_date', '-id']),
+            models.Index(fields=['batch', 'test_date', 'id']),
+        ]
+
     def __str__(self):
         return f"{self.test_type} - {self.batch.batch_id} - {'PASS' if self.pass_status else 'FAIL'}"
 
@@ -236,6 +295,117 @@ class ConsumerVerification(models.Model):
     # Analytics
     user_agent = models.TextField(blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-verification_date', '-id']),
+        ]
     
     def __str__(self):
         return f"Verification - {self.batch.batch_id} on {self.verification_date.date()}"
+
+class TimelineEntry(models.Model):
+    """Materialized supply chain timeline entry, written alongside its source record"""
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='timeline_entries')
+    source_type = models.CharField(
+        max_length=20,
+        choices=[
+            ('COLLECTION', 'Collection'),
+            ('PROCESSING', 'Processing Event'),
+            ('QUALITY_TEST', 'Quality Test'),
+        ]
+    )
+    source_id = models.CharField(max_length=50)
+    occurred_at = models.DateTimeField()
+    data = models.JSONField()
+
+    class Meta:
+        ordering = ['occurred_at', 'id']
+        unique_together = [('source_type', 'source_id')]
+        indexes = [
+            models.Index(fields=['batch', 'occurred_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.source_type} - {self.batch_id} on {self.occurred_at.date()}"
+
+class BatchAnomaly(models.Model):
+    """Suspected duplicate or implausible batch"""
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='anomalies')
+    anomaly_type = models.CharField(
+        max_length=30,
+        choices=[
+            ('DUPLICATE', 'Possible Duplicate'),
+            ('QUANTITY_OUTLIER', 'Quantity Out Of Range'),
+            ('OUT_OF_HABITAT', 'Outside Species Habitat'),
+        ]
+    )
+    related_batch = models.ForeignKey(
+        Batch, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    score = models.FloatField()
+    details = models.JSONField(default=dict, blank=True)
+    detected_by = models.CharField(
+        max_length=10,
+        choices=[
+            ('INGEST', 'Ingest Check'),
+            ('SWEEP', 'Nightly Sweep'),
+        ]
+    )
+    is_resolved = models.BooleanField(default=False)
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-detected_at']
+        verbose_name_plural = "Batch Anomalies"
+
+    def __str__(self):
+        return f"{self.anomaly_type} - {self.batch_id}"
+
+class ChangeLogEntry(models.Model):
+    """Ordered log of writes to synced models, read by the change feed"""
+    model = models.CharField(
+        max_length=30,
+        choices=[
+            ('batch', 'Batch'),
+            ('processing_event', 'Processing Event'),
+            ('quality_test', 'Quality Test'),
+            ('blockchain_transaction', 'Blockchain Transaction'),
+        ]
+    )
+    object_id = models.CharField(max_length=50)
+    operation = models.CharField(
+        max_length=10,
+        choices=[
+            ('CREATE', 'Created'),
+            ('UPDATE', 'Updated'),
+            ('DELETE', 'Deleted'),
+        ]
+    )
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'id']),
+            models.Index(fields=['changed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.operation} {self.model} {self.object_id}"
+
+class IdempotencyKey(models.Model):
+    """Stored response of a POST sent with an Idempotency-Key header, replayed on retries"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    # Null while the first request with the key is still running
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = [('user', 'key')]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.contrib.gis.geos import Polygon
+from django.contrib.gis.measure import D
+from django.db.models import Q
+import base64
+import json
+import math
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = 111.32
+
+def encode_cursor(knn, pk):
+    return base64.urlsafe_b64encode(json.dumps([knn, pk]).encode()).decode()
+
+def decode_cursor(cursor):
+    knn, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return float(knn), pk
+
+def parse_limit(value):
+    """Clamp a requested result limit to NEARBY_MAX_LIMIT"""
+    if value is None:
+        return settings.NEARBY_DEFAULT_LIMIT
+    return max(1, min(int(value), settings.NEARBY_MAX_LIMIT))
+
+def radius_envelope(point, radius_km):
+    """Degree bounding box enclosing a radius around a point"""
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(point.y)), 0.01))
+    return Polygon.from_bbox((
+        max(point.x - lng_delta, -180.0), max(point.y - lat_delta, -90.0),
+        min(point.x + lng_delta, 180.0), min(point.y + lat_delta, 90.0),
+    ), srid=4326)
+
+def knn_nearby(queryset, field, point, radius_km, limit, cursor=None):
+    """
+    Nearest rows to a point within radius_km, in KNN order.
+
+    The GiST index answers both the bounding box prefilter and the ``<->``
+    ordering, so PostgreSQL stops after limit rows however large the radius
+    is. The geodesic radius check runs before the LIMIT, on rows the index
+    has already narrowed to the bounding box, so rows in its corners never
+    take a page slot. Returns ``(rows, next_cursor)``; pass the cursor back
+    to continue the scan.
+    """
+    queryset = queryset.filter(**{
+        f'{field}__bboverlaps': radius_envelope(point, radius_km),
+        f'{field}__distance_lte': (point, D(km=radius_km)),
+    }).annotate(
+        knn=GeometryDistance(field, point),
+        distance=Distance(field, point),
+    )
+
+    if cursor:
+        last_knn, last_pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(knn__gt=last_knn) | Q(knn=last_knn, pk__gt=last_pk))
+
+    rows = list(queryset.order_by('knn', 'pk')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].knn, rows[-1].pk)
+    return rows, next_cursor
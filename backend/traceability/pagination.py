@@ -0,0 +1,10 @@
+from herbtrace.pagination import KeysetPagination
+
+class TimelinePagination(KeysetPagination):
+    ordering = ('occurred_at', 'id')
+
+class BatchEventPagination(KeysetPagination):
+    ordering = ('event_date', 'id')
+
+class BatchTestPagination(KeysetPagination):
+    ordering = ('test_date', 'id')
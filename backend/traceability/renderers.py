@@ -0,0 +1,13 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+class VectorTileRenderer(BaseRenderer):
+    media_type = 'application/vnd.mapbox-vector-tile'
+    format = 'mvt'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        # Error responses (401/404) still carry a JSON body
+        return JSONRenderer().render(data)
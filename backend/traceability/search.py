@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import F, OuterRef, Q, Subquery, TextField
+from django.db.models.functions import Cast, Greatest
+from rest_framework import filters
+
+from .models import HerbSpecies, Collector
+
+SEARCH_CONFIG = 'simple'
+
+def _vector(*expressions, weight):
+    return SearchVector(*expressions, weight=weight, config=SEARCH_CONFIG)
+
+def batch_search_vector():
+    """tsvector of a batch: its ID, species names and collector, built in SQL"""
+    species = HerbSpecies.objects.filter(pk=OuterRef('species_id'))
+    collector = Collector.objects.filter(pk=OuterRef('collector_id'))
+    return (
+        _vector('batch_id', weight='A')
+        + _vector(
+            Subquery(species.values('name')),
+            Subquery(species.values('scientific_name')),
+            Subquery(species.values('sanskrit_name')),
+            Subquery(species.annotate(names=Cast('common_names', TextField())).values('names')),
+            weight='B'
+        )
+        + _vector(
+            Subquery(collector.values('collector_id')),
+            Subquery(collector.values('user__first_name')),
+            Subquery(collector.values('user__last_name')),
+            weight='C'
+        )
+    )
+
+def collector_search_vector():
+    """tsvector of a collector: its ID and name"""
+    user = User.objects.filter(pk=OuterRef('user_id'))
+    return (
+        _vector('collector_id', weight='A')
+        + _vector(
+            Subquery(user.values('first_name')),
+            Subquery(user.values('last_name')),
+            weight='B'
+        )
+    )
+
+def refresh_batch_search_documents(queryset):
+    return queryset.update(search_document=batch_search_vector())
+
+def refresh_collector_search_documents(queryset):
+    return queryset.update(search_document=collector_search_vector())
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    Ranked search over pg_trgm indexed fields and an optional tsvector document.
+
+    ``search_fields`` are matched with ILIKE, which the GIN trigram indexes
+    answer without a sequential scan, and ranked by trigram similarity.
+    Views with a ``search_document_field`` also match the precomputed
+    document and rank by ts_rank. Results are ordered by rank unless the
+    client asks for an explicit ``ordering``.
+    """
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        text = ' '.join(terms)
+
+        condition = Q()
+        ranks = []
+        for field in getattr(view, 'search_fields', []):
+            condition |= Q(**{f'{field}__icontains': text})
+            ranks.append(TrigramSimilarity(field, text))
+
+        document_field = getattr(view, 'search_document_field', None)
+        if document_field:
+            query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+            condition |= Q(**{document_field: query})
+            ranks.append(SearchRank(F(document_field), query))
+
+        rank = Greatest(*ranks) if len(ranks) > 1 else ranks[0]
+        queryset = queryset.filter(condition).annotate(search_rank=rank)
+
+        if not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
@@ -1,32 +1,76 @@
 from rest_framework import serializers
-from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from django.contrib.auth.models import User
-from .models import HerbSpecies, Collector, Batch, ProcessingEvent, QualityTest, ConsumerVerification
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max, Min, Q
+from rest_framework.reverse import reverse
+from .models import HerbSpecies, Collector, Batch, ProcessingEvent, QualityTest, ConsumerVerification, BatchAnomaly
+from .timeline import get_timeline
+from .habitats import habitat_registry
+from .catalogue import species_catalogue
+from .sparse import DynamicFieldsMixin
+from .geojson import GeoFeatureSerializer
+from .pagination import BatchEventPagination, BatchTestPagination
 import qrcode
 import io
 import base64
 
+class CatalogueSpeciesField(serializers.Field):
+    """Compact species from the in-process catalogue, so batches need no species join"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'species_id')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, species_id):
+        return species_catalogue.get(species_id)
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves primary keys against instances preloaded into the ``preloaded`` context"""
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        preloaded = self.context.get('preloaded', {}).get(model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            return preloaded[model._meta.pk.to_python(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+def species_name(species_id):
+    species = species_catalogue.get(species_id)
+    return species['name'] if species else None
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 'email']
         read_only_fields = ['id']
 
-class HerbSpeciesSerializer(serializers.ModelSerializer):
+class HerbSpeciesSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = HerbSpecies
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at']
 
-class CollectorSerializer(GeoFeatureModelSerializer):
+class CollectorSerializer(DynamicFieldsMixin, GeoFeatureSerializer):
     user = UserSerializer(read_only=True)
     specializations = HerbSpeciesSerializer(many=True, read_only=True)
     
     class Meta:
         model = Collector
         geo_field = 'location'
-        fields = '__all__'
+        exclude = ['search_document']
         read_only_fields = ['created_at', 'updated_at']
+        always_fields = ['id', 'location']
+        field_dependencies = {
+            'user': {'only': ['user'], 'select_related': ['user']},
+            'specializations': {'prefetch_related': ['specializations']},
+        }
 
 class CollectorCreateSerializer(serializers.ModelSerializer):
     user_data = UserSerializer()
@@ -42,9 +86,9 @@ class CollectorCreateSerializer(serializers.ModelSerializer):
         collector = Collector.objects.create(user=user, **validated_data)
         return collector
 
-class BatchSerializer(GeoFeatureModelSerializer):
-    species = HerbSpeciesSerializer(read_only=True)
-    collector = CollectorSerializer(read_only=True)
+class BatchSerializer(DynamicFieldsMixin, GeoFeatureSerializer):
+    species = serializers.PrimaryKeyRelatedField(read_only=True)
+    collector = serializers.PrimaryKeyRelatedField(read_only=True)
     processing_events_count = serializers.SerializerMethodField()
     quality_tests_count = serializers.SerializerMethodField()
     verifications_count = serializers.SerializerMethodField()
@@ -54,9 +98,31 @@ class BatchSerializer(GeoFeatureModelSerializer):
     class Meta:
         model = Batch
         geo_field = 'collection_location'
-        fields = '__all__'
+        exclude = ['search_document']
         read_only_fields = ['batch_id', 'blockchain_hash', 'is_blockchain_verified', 
                            'created_at', 'updated_at']
+        # Lean list shape: species and collector by ID, the rest via ?fields= and ?expand=
+        default_fields = ['batch_id', 'species', 'collector', 'collection_date', 'collection_location',
+                          'quantity_kg', 'quality_grade', 'status', 'is_blockchain_verified']
+        always_fields = ['batch_id', 'collection_location']
+        expandable_fields = {
+            'species': (CatalogueSpeciesField, {}),
+            'collector': (CollectorSerializer, {'read_only': True}),
+        }
+        field_dependencies = {
+            'species+': {'only': ['species'], 'related': ['species']},
+            'collector+': {'only': ['collector'], 'select_related': ['collector__user'],
+                           'prefetch_related': ['collector__specializations']},
+            'processing_events_count': {'prefetch_related': ['processing_events']},
+            'quality_tests_count': {'prefetch_related': ['quality_tests']},
+            'verifications_count': {'prefetch_related': ['verifications']},
+            'qr_code': {},
+            'sustainability_score': {
+                'only': ['harvesting_method', 'soil_health_score', 'regeneration_time_months',
+                         'quality_grade', 'collector'],
+                'select_related': ['collector'],
+            },
+        }
     
     def get_processing_events_count(self, obj):
         return obj.processing_events.count()
@@ -117,15 +183,36 @@ class BatchSerializer(GeoFeatureModelSerializer):
         
         return min(100, max(0, score))
 
+class BatchAnomalySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BatchAnomaly
+        fields = ['id', 'batch', 'anomaly_type', 'related_batch', 'score', 'details',
+                 'detected_by', 'is_resolved', 'detected_at']
+        read_only_fields = ['detected_at']
+
 class BatchCreateSerializer(serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+    anomalies = BatchAnomalySerializer(many=True, read_only=True)
+    
     class Meta:
         model = Batch
         fields = ['species', 'collector', 'collection_date', 'collection_location',
                  'collection_area_hectares', 'altitude_meters', 'weather_conditions',
                  'quantity_kg', 'moisture_content', 'quality_grade', 'harvesting_method',
-                 'regeneration_time_months', 'soil_health_score', 'collection_photos']
+                 'regeneration_time_months', 'soil_health_score', 'collection_photos',
+                 'anomalies']
+    
+    def validate(self, attrs):
+        species = attrs.get('species')
+        location = attrs.get('collection_location')
+        if settings.HABITAT_VALIDATION_ENABLED and species and location:
+            if habitat_registry.is_within_habitat(species.id, location) is False:
+                raise serializers.ValidationError({
+                    'collection_location': f'Location is outside the known habitat of {species.name}'
+                })
+        return attrs
 
-class ProcessingEventSerializer(GeoFeatureModelSerializer):
+class ProcessingEventSerializer(DynamicFieldsMixin, GeoFeatureSerializer):
     processor = UserSerializer(read_only=True)
     batch_info = serializers.SerializerMethodField()
     
@@ -135,30 +222,39 @@ class ProcessingEventSerializer(GeoFeatureModelSerializer):
         fields = '__all__'
         read_only_fields = ['blockchain_hash', 'is_blockchain_verified', 
                            'created_at', 'updated_at']
+        always_fields = ['id', 'location']
+        field_dependencies = {
+            'processor': {'only': ['processor'], 'select_related': ['processor']},
+            'batch_info': {'only': ['batch'], 'select_related': ['batch__collector'], 'related': ['batch__species']},
+        }
     
     def get_batch_info(self, obj):
         return {
             'batch_id': obj.batch.batch_id,
-            'species': obj.batch.species.name,
+            'species': species_name(obj.batch.species_id),
             'collector': obj.batch.collector.collector_id
         }
 
-class QualityTestSerializer(serializers.ModelSerializer):
+class QualityTestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     batch_info = serializers.SerializerMethodField()
     
     class Meta:
         model = QualityTest
         fields = '__all__'
         read_only_fields = ['created_at']
+        always_fields = ['id']
+        field_dependencies = {
+            'batch_info': {'only': ['batch'], 'select_related': ['batch'], 'related': ['batch__species']},
+        }
     
     def get_batch_info(self, obj):
         return {
             'batch_id': obj.batch.batch_id,
-            'species': obj.batch.species.name,
+            'species': species_name(obj.batch.species_id),
             'quality_grade': obj.batch.quality_grade
         }
 
-class ConsumerVerificationSerializer(GeoFeatureModelSerializer):
+class ConsumerVerificationSerializer(DynamicFieldsMixin, GeoFeatureSerializer):
     batch_info = serializers.SerializerMethodField()
     
     class Meta:
@@ -166,88 +262,119 @@ class ConsumerVerificationSerializer(GeoFeatureModelSerializer):
         geo_field = 'consumer_location'
         fields = '__all__'
         read_only_fields = ['verification_date']
+        always_fields = ['id', 'consumer_location']
+        field_dependencies = {
+            'batch_info': {'only': ['batch'], 'select_related': ['batch__collector'], 'related': ['batch__species']},
+        }
+        fast_fields = {
+            'batch_info': ['batch_id', 'batch__species_id', 'batch__collector__collector_id', 'batch__status'],
+        }
     
     def get_batch_info(self, obj):
+        return self.fast_batch_info(
+            obj.batch.batch_id, obj.batch.species_id, obj.batch.collector.collector_id, obj.batch.status
+        )
+    
+    def fast_batch_info(self, batch_id, species_id, collector_id, batch_status):
         return {
-            'batch_id': obj.batch.batch_id,
-            'species': obj.batch.species.name,
-            'collector': obj.batch.collector.collector_id,
-            'status': obj.batch.status
+            'batch_id': batch_id,
+            'species': species_name(species_id),
+            'collector': collector_id,
+            'status': batch_status
         }
 
 class BatchDetailSerializer(BatchSerializer):
-    """Detailed batch serializer with all related data"""
-    processing_events = ProcessingEventSerializer(many=True, read_only=True)
-    quality_tests = QualityTestSerializer(many=True, read_only=True)
+    """
+    Detailed batch serializer with related data.
+
+    Processing events and quality tests are summarised, with only the first
+    BATCH_DETAIL_HISTORY_LIMIT of each inlined; full histories are paginated
+    via /batches/{id}/events/ and /batches/{id}/tests/. Verification fields
+    change with every consumer scan rather than with the batch version, so
+    views cache the payload without BATCH_DETAIL_VERIFICATION_FIELDS and add
+    them per response with render_verification_fields().
+    """
+    species = HerbSpeciesSerializer(read_only=True)
+    collector = CollectorSerializer(read_only=True)
+    processing_events = serializers.SerializerMethodField()
+    processing_events_summary = serializers.SerializerMethodField()
+    quality_tests = serializers.SerializerMethodField()
+    quality_tests_summary = serializers.SerializerMethodField()
     recent_verifications = serializers.SerializerMethodField()
     supply_chain_timeline = serializers.SerializerMethodField()
     
+    class Meta(BatchSerializer.Meta):
+        default_fields = None
+        # Counted with COUNT queries instead of prefetching unbounded histories
+        field_dependencies = {
+            **BatchSerializer.Meta.field_dependencies,
+            'processing_events_count': {},
+            'quality_tests_count': {},
+            'verifications_count': {},
+        }
+    
+    def get_processing_events(self, obj):
+        events = obj.processing_events.select_related('processor').order_by(*BatchEventPagination.ordering)
+        events = list(events[:settings.BATCH_DETAIL_HISTORY_LIMIT])
+        for event in events:
+            # batch_info reads this batch and its loaded collector, not a query per row
+            event.batch = obj
+        return ProcessingEventSerializer(events, many=True).data
+    
+    def get_processing_events_summary(self, obj):
+        by_type = list(
+            obj.processing_events.order_by().values('event_type')
+            .annotate(count=Count('id'), first=Min('event_date'), last=Max('event_date'))
+        )
+        return {
+            'count': sum(row['count'] for row in by_type),
+            'event_types': {row['event_type']: row['count'] for row in by_type},
+            'first_event_date': min((row['first'] for row in by_type), default=None),
+            'last_event_date': max((row['last'] for row in by_type), default=None),
+            'url': reverse('batch-events', kwargs={'pk': obj.batch_id}),
+        }
+    
+    def get_quality_tests(self, obj):
+        tests = list(obj.quality_tests.order_by(*BatchTestPagination.ordering)[:settings.BATCH_DETAIL_HISTORY_LIMIT])
+        for test in tests:
+            test.batch = obj
+        return QualityTestSerializer(tests, many=True).data
+    
+    def get_quality_tests_summary(self, obj):
+        by_type = list(
+            obj.quality_tests.order_by().values('test_type')
+            .annotate(count=Count('id'), passed=Count('id', filter=Q(pass_status=True)), last=Max('test_date'))
+        )
+        count = sum(row['count'] for row in by_type)
+        passed = sum(row['passed'] for row in by_type)
+        return {
+            'count': count,
+            'passed': passed,
+            'failed': count - passed,
+            'test_types': {row['test_type']: row['count'] for row in by_type},
+            'last_test_date': max((row['last'] for row in by_type), default=None),
+            'url': reverse('batch-tests', kwargs={'pk': obj.batch_id}),
+        }
+    
     def get_recent_verifications(self, obj):
-        recent = obj.verifications.order_by('-verification_date')[:10]
-        return ConsumerVerificationSerializer(recent, many=True).data
+        return render_verification_fields(obj.batch_id)['recent_verifications']
     
     def get_supply_chain_timeline(self, obj):
-        """Create a timeline of all events for this batch"""
-        timeline = []
-        
-        # Collection event
-        timeline.append({
-            'date': obj.collection_date,
-            'type': 'COLLECTION',
-            'title': 'Herb Collection',
-            'description': f'Collected {obj.quantity_kg}kg of {obj.species.name}',
-            'location': {
-                'lat': obj.collection_location.y,
-                'lng': obj.collection_location.x
-            } if obj.collection_location else None,
-            'actor': obj.collector.user.get_full_name(),
-            'details': {
-                'quantity': str(obj.quantity_kg),
-                'quality_grade': obj.quality_grade,
-                'harvesting_method': obj.harvesting_method
-            }
-        })
-        
-        # Processing events
-        for event in obj.processing_events.all():
-            timeline.append({
-                'date': event.event_date,
-                'type': event.event_type,
-                'title': event.get_event_type_display(),
-                'description': f'{event.event_type.lower().replace("_", " ").title()} at {event.facility_name}',
-                'location': {
-                    'lat': event.location.y,
-                    'lng': event.location.x
-                } if event.location else None,
-                'actor': event.processor.get_full_name(),
-                'details': {
-                    'facility': event.facility_name,
-                    'input_quantity': str(event.input_quantity_kg),
-                    'output_quantity': str(event.output_quantity_kg) if event.output_quantity_kg else None,
-                    'yield_percentage': str(event.yield_percentage) if event.yield_percentage else None
-                }
-            })
-        
-        # Quality tests
-        for test in obj.quality_tests.all():
-            timeline.append({
-                'date': test.test_date,
-                'type': 'QUALITY_TEST',
-                'title': f'{test.get_test_type_display()}',
-                'description': f'Quality test at {test.testing_lab}',
-                'location': None,
-                'actor': test.testing_lab,
-                'details': {
-                    'test_type': test.test_type,
-                    'pass_status': test.pass_status,
-                    'lab': test.testing_lab,
-                    'certificate': test.certificate_number
-                }
-            })
-        
-        # Sort timeline by date
-        timeline.sort(key=lambda x: x['date'])
-        return timeline
+        """Materialized timeline of all events for this batch"""
+        entries = get_timeline(obj.batch_id).values_list('data', flat=True)
+        return list(entries[:settings.TIMELINE_DETAIL_LIMIT])
+
+BATCH_DETAIL_VERIFICATION_FIELDS = ('verifications_count', 'recent_verifications')
+
+def render_verification_fields(batch_id):
+    """Verification fields of a batch detail payload, read fresh for every response"""
+    verifications = ConsumerVerification.objects.filter(batch_id=batch_id)
+    # Joins the batch and collector that batch_info reads, rather than two queries per row
+    recent = ConsumerVerificationSerializer().optimize_queryset(verifications.order_by('-verification_date'))
+    return {
+        'verifications_count': verifications.count(),
+        'recent_verifications': ConsumerVerificationSerializer(recent[:10], many=True).data,
+    }
 
 class BatchStatsSerializer(serializers.Serializer):
     """Serializer for batch statistics"""
@@ -0,0 +1,181 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from .models import HerbSpecies, Batch, Collector, ProcessingEvent, QualityTest, ConsumerVerification, SpeciesHabitat
+from .cache import bump_batch_version
+from .tiles import invalidate_clusters, invalidate_point_clusters, invalidate_point_tiles, invalidate_tiles
+from .habitats import bump_habitat_version
+from .catalogue import bump_species_version
+from .changes import record_change
+from .search import refresh_batch_search_documents, refresh_collector_search_documents
+from .tasks import refresh_batch_search_documents_task
+from . import timeline
+
+# Batch fields rendered into its collection timeline entry
+COLLECTION_ENTRY_FIELDS = {
+    'collection_date', 'quantity_kg', 'species', 'collector', 'collection_location',
+    'quality_grade', 'harvesting_method',
+}
+
+@receiver(post_save, sender=Batch)
+def batch_timeline_handler(sender, instance, update_fields=None, **kwargs):
+    """Keep the collection entry of the materialized timeline current"""
+    if update_fields and not COLLECTION_ENTRY_FIELDS.intersection(update_fields):
+        return
+    timeline.record_collection(instance)
+
+@receiver(post_save, sender=ProcessingEvent)
+def processing_event_timeline_handler(sender, instance, update_fields=None, **kwargs):
+    """Append or refresh the timeline entry of a processing event"""
+    if update_fields and set(update_fields) <= {'blockchain_hash', 'is_blockchain_verified', 'updated_at'}:
+        return
+    timeline.record_processing_event(instance)
+
+@receiver(post_save, sender=QualityTest)
+def quality_test_timeline_handler(sender, instance, **kwargs):
+    """Append or refresh the timeline entry of a quality test"""
+    timeline.record_quality_test(instance)
+
+@receiver(post_delete, sender=ProcessingEvent)
+def processing_event_deleted_handler(sender, instance, **kwargs):
+    timeline.remove_entry('PROCESSING', instance.pk)
+
+@receiver(post_delete, sender=QualityTest)
+def quality_test_deleted_handler(sender, instance, **kwargs):
+    timeline.remove_entry('QUALITY_TEST', instance.pk)
+
+@receiver(pre_save, sender=Batch)
+def batch_previous_location_handler(sender, instance, update_fields=None, **kwargs):
+    """Remember where a saved batch was, so a move also invalidates the tiles it left"""
+    instance._previous_location = None
+    if instance._state.adding or (update_fields and 'collection_location' not in update_fields):
+        return
+    instance._previous_location = (
+        Batch.objects.filter(pk=instance.pk).values_list('collection_location', flat=True).first()
+    )
+
+@receiver(post_save, sender=Batch)
+def batch_map_tiles_handler(sender, instance, update_fields=None, **kwargs):
+    """Drop cached map tiles that contain a new or moved batch, before and after the move"""
+    if update_fields and not {'collection_location', 'quantity_kg', 'status', 'quality_grade'}.intersection(update_fields):
+        return
+    points = [instance.collection_location, getattr(instance, '_previous_location', None)]
+    invalidate_clusters(points)
+    invalidate_tiles('collections', points)
+
+@receiver(post_delete, sender=Batch)
+def batch_deleted_map_tiles_handler(sender, instance, **kwargs):
+    invalidate_point_clusters(instance.collection_location)
+    invalidate_point_tiles('collections', instance.collection_location)
+
+@receiver(pre_save, sender=Collector)
+def collector_previous_location_handler(sender, instance, update_fields=None, **kwargs):
+    instance._previous_location = None
+    if instance._state.adding or (update_fields and 'location' not in update_fields):
+        return
+    instance._previous_location = (
+        Collector.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+    )
+
+@receiver([post_save, post_delete], sender=Collector)
+def collector_map_tiles_handler(sender, instance, **kwargs):
+    invalidate_tiles('collectors', [instance.location, getattr(instance, '_previous_location', None)])
+
+@receiver([post_save, post_delete], sender=ConsumerVerification)
+def verification_map_tiles_handler(sender, instance, **kwargs):
+    invalidate_point_tiles('verifications', instance.consumer_location)
+
+@receiver([post_save, post_delete], sender=SpeciesHabitat)
+def species_habitat_changed_handler(sender, instance, **kwargs):
+    """Reload prepared habitat geometries used to validate new batches"""
+    bump_habitat_version()
+
+@receiver([post_save, post_delete], sender=HerbSpecies)
+def species_catalogue_handler(sender, instance, **kwargs):
+    """Reload the in-memory species catalogue used by autocomplete and batch payloads"""
+    bump_species_version()
+
+@receiver(post_save, sender=Batch)
+def batch_search_handler(sender, instance, update_fields=None, **kwargs):
+    """Rebuild the search document of a new batch or one with a new species or collector"""
+    if update_fields and not {'species', 'collector'}.intersection(update_fields):
+        return
+    refresh_batch_search_documents(Batch.objects.filter(pk=instance.pk))
+
+# Columns of each model that batch and collector search documents are built from
+SEARCHED_FIELDS = {
+    HerbSpecies: ('name', 'scientific_name', 'sanskrit_name', 'common_names'),
+    Collector: ('collector_id',),
+    User: ('first_name', 'last_name'),
+}
+
+@receiver(pre_save, sender=HerbSpecies)
+@receiver(pre_save, sender=Collector)
+@receiver(pre_save, sender=User)
+def searched_values_handler(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored searched columns, so saves that keep them skip the refresh"""
+    fields = SEARCHED_FIELDS[sender]
+    instance._searched_values = None
+    if instance._state.adding or (update_fields and not set(fields).intersection(update_fields)):
+        return
+    instance._searched_values = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+def _searched_fields_changed(instance, update_fields):
+    fields = SEARCHED_FIELDS[type(instance)]
+    if update_fields and not set(fields).intersection(update_fields):
+        return False
+    previous = getattr(instance, '_searched_values', None)
+    return previous is None or any(previous[name] != getattr(instance, name) for name in fields)
+
+def _refresh_batches_later(**filters):
+    """Queue the batch document refresh once the write commits, as it touches every matching batch"""
+    transaction.on_commit(lambda: refresh_batch_search_documents_task.apply_async(kwargs=filters))
+
+@receiver(post_save, sender=HerbSpecies)
+def species_search_handler(sender, instance, created=False, update_fields=None, **kwargs):
+    """Species names are part of the search document of every batch of the species"""
+    if not created and _searched_fields_changed(instance, update_fields):
+        _refresh_batches_later(species_id=instance.pk)
+
+@receiver(post_save, sender=Collector)
+def collector_search_handler(sender, instance, created=False, update_fields=None, **kwargs):
+    if not created and not _searched_fields_changed(instance, update_fields):
+        return
+    refresh_collector_search_documents(Collector.objects.filter(pk=instance.pk))
+    if not created:
+        _refresh_batches_later(collector_id=instance.pk)
+
+@receiver(post_save, sender=User)
+def user_search_handler(sender, instance, created=False, update_fields=None, **kwargs):
+    """Collector names live on the user, so renaming one refreshes its documents"""
+    if created or not _searched_fields_changed(instance, update_fields):
+        return
+    refresh_collector_search_documents(Collector.objects.filter(user_id=instance.pk))
+    _refresh_batches_later(collector__user_id=instance.pk)
+
+@receiver(post_save, sender=Batch)
+@receiver(post_save, sender=ProcessingEvent)
+@receiver(post_save, sender=QualityTest)
+def synced_model_saved_handler(sender, instance, created=False, **kwargs):
+    """Log writes for the change feed"""
+    record_change(instance, 'CREATE' if created else 'UPDATE')
+
+@receiver(post_delete, sender=Batch)
+@receiver(post_delete, sender=ProcessingEvent)
+@receiver(post_delete, sender=QualityTest)
+def synced_model_deleted_handler(sender, instance, **kwargs):
+    record_change(instance, 'DELETE')
+
+# Registered after the timeline handlers so a payload rendered for the new
+# version never sees the previous timeline
+@receiver([post_save, post_delete], sender=Batch)
+def batch_changed_handler(sender, instance, **kwargs):
+    """Invalidate cached batch payloads when the batch changes"""
+    bump_batch_version(instance.batch_id)
+
+@receiver([post_save, post_delete], sender=ProcessingEvent)
+@receiver([post_save, post_delete], sender=QualityTest)
+def batch_history_changed_handler(sender, instance, **kwargs):
+    """Invalidate cached batch payloads when its events or tests change"""
+    bump_batch_version(instance.batch_id)
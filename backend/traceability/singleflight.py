@@ -0,0 +1,117 @@
+from django.core.cache import cache
+import threading
+import time
+import uuid
+
+class _Call:
+    """An in-flight computation that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent computations of the same key into a single one.
+
+    Threads of one process share the result of the leader's call. Across
+    processes, the leader takes a lock in the shared cache and the other
+    processes wait for it to publish the result. With a process-local cache
+    backend (LocMemCache) that lock is local too and only threads coalesce.
+    """
+
+    def __init__(self, name, lock_timeout=30, wait_timeout=10, poll_interval=0.05):
+        self.name = name
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {
+            'executed': 0,
+            'coalesced': 0,
+            'remote_waits': 0,
+            'remote_hits': 0,
+        }
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
+
+    def do(self, key, fn):
+        """Run fn once for all concurrent callers of key in this process"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # The leader is stuck; do not hold this request hostage
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._counters['executed'] += 1
+            call.done.set()
+
+    def get_or_build(self, cache_key, builder, timeout):
+        """Return cache_key from the cache, building it at most once cluster-wide"""
+        value = cache.get(cache_key)
+        if value is not None:
+            return value
+        return self.do(cache_key, lambda: self._build_shared(cache_key, builder, timeout))
+
+    def _build_shared(self, cache_key, builder, timeout):
+        lock_key = f'{cache_key}:lock'
+        token = uuid.uuid4().hex
+        acquired = cache.add(lock_key, token, self.lock_timeout)
+
+        if not acquired:
+            # Another process is building the value; wait for it to publish
+            self._count('remote_waits')
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                value = cache.get(cache_key)
+                if value is not None:
+                    self._count('remote_hits')
+                    return value
+                if cache.get(lock_key) is None:
+                    break
+            acquired = cache.add(lock_key, token, self.lock_timeout)
+
+        try:
+            value = cache.get(cache_key)
+            if value is None:
+                value = builder()
+                cache.set(cache_key, value, timeout)
+            return value
+        finally:
+            if acquired and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+batch_flight = SingleFlight('batch-detail')
+stats_flight = SingleFlight('stats')
+
+def flight_stats():
+    """Counters for every single-flight group in this process"""
+    return {flight.name: flight.stats() for flight in (batch_flight, stats_flight)}
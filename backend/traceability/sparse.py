@@ -0,0 +1,166 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+# Query parameters that change the shape of a DynamicFieldsMixin representation
+SPARSE_PARAMS = {'fields', 'expand'}
+
+def split_names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for a serializer.
+
+    ``?fields=`` selects fields and ``?expand=`` swaps an ID field for its
+    nested representation; both are read from the request by the top-level
+    serializer only, or passed as ``fields=`` / ``expand=`` arguments.
+    Meta options:
+
+    - ``default_fields``: fields rendered without ``?fields=``, all when unset
+    - ``always_fields``: fields rendered whatever is requested
+    - ``expandable_fields``: name -> (field class, kwargs) used when expanded
+    - ``field_dependencies``: name (or ``name+`` when expanded) -> dict of
+      ``only``, ``select_related`` and ``prefetch_related`` lists, plus
+      ``related`` for relations read some other way (e.g. species names from
+      the catalogue); fields without an entry read the model column of the
+      same name
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._requested_fields = fields
+        self._requested_expand = expand
+        self._expanded = set()
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def _sparse_params(self):
+        fields, expand = self._requested_fields, self._requested_expand
+        request = self.context.get('request')
+        if request is not None and self._is_root():
+            if fields is None and 'fields' in request.query_params:
+                fields = split_names(request.query_params['fields'])
+            if expand is None:
+                expand = split_names(request.query_params.get('expand'))
+        return (set(fields) if fields is not None else None), set(expand or ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        meta = self.Meta
+        requested, expand = self._sparse_params()
+
+        expandable = getattr(meta, 'expandable_fields', {})
+        self._expanded = expand & set(expandable)
+        for name in self._expanded:
+            field_class, kwargs = expandable[name]
+            fields[name] = field_class(**kwargs)
+
+        if requested is None:
+            default = getattr(meta, 'default_fields', None)
+            if default is None:
+                return fields
+            requested = set(default)
+
+        keep = requested | set(getattr(meta, 'always_fields', ())) | self._expanded
+        return {name: field for name, field in fields.items() if name in keep}
+
+    def get_dependencies(self):
+        """
+        ``(only, select_related, prefetch_related)`` read by the selected fields.
+
+        Nested DynamicFieldsMixin serializers without a declared spec bring
+        their own dependencies under their source: joined for a forward
+        relation, prefetched for a ``many`` one. ``only`` is None when some
+        field's columns are unknown.
+        """
+        return self._dependency_sets()[:3]
+
+    def get_related_lookups(self):
+        """Relation paths whose rows the selected fields render, used to version responses"""
+        _, select_related, prefetch_related, related = self._dependency_sets()
+        return select_related | prefetch_related | related
+
+    def _dependency_sets(self):
+        model = self.Meta.model
+        dependencies = getattr(self.Meta, 'field_dependencies', {})
+        only = {model._meta.pk.name}
+        select_related = set()
+        prefetch_related = set()
+        related = set()
+
+        for name, field in self.fields.items():
+            spec = dependencies.get(f'{name}+' if name in self._expanded else name)
+            if spec is None:
+                spec = _nested_dependencies(field)
+            if spec is None:
+                try:
+                    model_field = model._meta.get_field(field.source.split('.')[0])
+                except FieldDoesNotExist:
+                    # Unknown dependencies, so load every column
+                    only = None
+                    continue
+                if only is not None and model_field.concrete:
+                    only.add(model_field.name)
+                continue
+            if only is not None:
+                only.update(spec.get('only', ()))
+            select_related.update(spec.get('select_related', ()))
+            prefetch_related.update(spec.get('prefetch_related', ()))
+            related.update(spec.get('related', ()))
+        return only, select_related, prefetch_related, related
+
+    def optimize_queryset(self, queryset, extra_columns=()):
+        """Load only the columns and relations the selected fields read"""
+        only, select_related, prefetch_related = self.get_dependencies()
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if only is not None:
+            queryset = queryset.only(*only, *extra_columns)
+        return queryset
+
+def _nested_dependencies(field):
+    many = isinstance(field, serializers.ListSerializer)
+    child = field.child if many else field
+    if not isinstance(child, DynamicFieldsMixin) or field.source == '*':
+        return None
+
+    source = field.source.replace('.', '__')
+    _, select_related, prefetch_related, related = child._dependency_sets()
+    nested = [f'{source}__{lookup}' for lookup in select_related | prefetch_related]
+    related = [f'{source}__{lookup}' for lookup in related]
+    if many:
+        return {'prefetch_related': [source, *nested], 'related': related}
+    return {
+        'only': [source],
+        'select_related': [source, *(f'{source}__{lookup}' for lookup in select_related)],
+        'prefetch_related': [f'{source}__{lookup}' for lookup in prefetch_related],
+        'related': related,
+    }
+
+class SparseFieldsetMixin:
+    """
+    Fit list and detail querysets to the fields their DynamicFieldsMixin
+    serializer renders, so nested reads are joined or prefetched up front.
+
+    Ordering fields stay loaded because keyset pagination reads them from the
+    instances.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) not in self.sparse_actions:
+            return queryset
+
+        serializer = self.get_serializer()
+        if not isinstance(serializer, DynamicFieldsMixin):
+            return queryset
+        ordering = {name.lstrip('-') for name in [*(self.ordering or ()), *getattr(self, 'ordering_fields', ())]}
+        return serializer.optimize_queryset(queryset, extra_columns=ordering)
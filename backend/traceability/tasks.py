@@ -0,0 +1,36 @@
+from celery import shared_task
+import logging
+
+from .anomalies import sweep_batch_anomalies
+from .changes import prune_change_log
+from .idempotency import prune_idempotency_keys
+from .models import Batch
+from .search import refresh_batch_search_documents
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def sweep_batch_anomalies_task():
+    """Nightly duplicate and quantity outlier sweep over all batches"""
+    flagged = sweep_batch_anomalies()
+    logger.info(f"Batch anomaly sweep flagged {flagged} anomalies")
+    return flagged
+
+@shared_task
+def prune_change_log_task():
+    """Drop change feed entries past the retention window"""
+    pruned = prune_change_log()
+    logger.info(f"Pruned {pruned} change log entries")
+    return pruned
+
+@shared_task
+def prune_idempotency_keys_task():
+    """Drop stored idempotent responses past their TTL"""
+    pruned = prune_idempotency_keys()
+    logger.info(f"Pruned {pruned} expired idempotency keys")
+    return pruned
+
+@shared_task
+def refresh_batch_search_documents_task(**filters):
+    """Rebuild the search documents of the batches matching filters, off the request path"""
+    return refresh_batch_search_documents(Batch.objects.filter(**filters))
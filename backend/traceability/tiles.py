@@ -0,0 +1,203 @@
+from django.conf import settings
+from django.contrib.gis.db.models import Collect
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Sum
+import glob
+import math
+import os
+import tempfile
+import time
+
+from .models import Batch, Collector, ConsumerVerification
+from .geojson import point_geometry
+
+# Web mercator stops at +/-85.0511 degrees of latitude
+MAX_LATITUDE = 85.0511287798
+
+CLUSTER_CACHE_KEY = 'batch-clusters:{z}:{x}:{y}:{version}'
+TILE_VERSION_KEY = 'tile-version:{layer}:{z}:{x}:{y}'
+
+# Cluster tiles share the per-tile versions of the vector tile layers
+CLUSTER_LAYER = 'clusters'
+
+# Vector tile layers: source model, geometry column and the minimal attribute set
+VECTOR_TILE_LAYERS = {
+    'collections': {
+        'model': Batch,
+        'geom': 'collection_location',
+        'attributes': ['batch_id', 'species_id', 'status', 'quality_grade'],
+    },
+    'collectors': {
+        'model': Collector,
+        'geom': 'location',
+        'attributes': ['id', 'collector_id', 'certification_level'],
+    },
+    'verifications': {
+        'model': ConsumerVerification,
+        'geom': 'consumer_location',
+        'attributes': ['id', 'batch_id', 'verification_method'],
+    },
+}
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) in degrees of an XYZ tile"""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+def tile_for_point(lng, lat, z):
+    """XYZ tile containing a point at zoom z"""
+    n = 2 ** z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tiles_for_bbox(west, south, east, north, z):
+    """XYZ tiles covering a bounding box at zoom z"""
+    x0, y0 = tile_for_point(west, north, z)
+    x1, y1 = tile_for_point(east, south, z)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+def _build_tile_clusters(z, x, y):
+    west, south, east, north = tile_bounds(z, x, y)
+    cell_size = (east - west) / settings.CLUSTER_GRID_CELLS
+
+    cells = (
+        Batch.objects
+        .filter(collection_location__intersects=Polygon.from_bbox((west, south, east, north)))
+        .annotate(cell=SnapToGrid('collection_location', cell_size))
+        .values('cell')
+        .annotate(
+            count=Count('batch_id'),
+            total_quantity=Sum('quantity_kg'),
+            center=Centroid(Collect('collection_location')),
+        )
+    )
+    return [
+        {
+            'type': 'Feature',
+            'geometry': point_geometry(cell['center'].x, cell['center'].y),
+            'properties': {
+                'count': cell['count'],
+                'total_quantity_kg': str(cell['total_quantity']),
+            }
+        }
+        for cell in cells
+    ]
+
+def _seed_version():
+    """Versions come from the clock, so a version reseeded after expiry never names an old tile"""
+    return time.time_ns() // 1000
+
+def tile_version(layer, z, x, y):
+    """
+    Current version of one tile of a layer, from the shared cache.
+
+    Cached tiles are keyed by it, so a bump reaches every host and process,
+    and it expires after TILE_CACHE_TIMEOUT, which bounds how long writes
+    that skip the signals (queryset updates) can leave a tile stale.
+    """
+    key = TILE_VERSION_KEY.format(layer=layer, z=z, x=x, y=y)
+    version = cache.get(key)
+    if version is None:
+        version = _seed_version()
+        if not cache.add(key, version, timeout=settings.TILE_CACHE_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+def _bump_tile_versions(layer, points, max_zoom):
+    """Give the tiles of a layer containing any of the points new versions, with one write"""
+    keys = set()
+    for point in points:
+        if not point:
+            continue
+        for z in range(max_zoom + 1):
+            x, y = tile_for_point(point.x, point.y, z)
+            keys.add(TILE_VERSION_KEY.format(layer=layer, z=z, x=x, y=y))
+    if keys:
+        version = _seed_version()
+        cache.set_many({key: version for key in keys}, timeout=settings.TILE_CACHE_TIMEOUT)
+
+def get_tile_clusters(z, x, y):
+    """Grid clusters of batch collection points in one tile, cached per tile version"""
+    key = CLUSTER_CACHE_KEY.format(z=z, x=x, y=y, version=tile_version(CLUSTER_LAYER, z, x, y))
+    clusters = cache.get(key)
+    if clusters is None:
+        clusters = _build_tile_clusters(z, x, y)
+        cache.set(key, clusters, timeout=settings.CLUSTER_CACHE_TIMEOUT)
+    return clusters
+
+def invalidate_point_clusters(point):
+    """Retire the cached cluster tiles containing a point at every zoom level"""
+    invalidate_clusters([point])
+
+def invalidate_clusters(points):
+    """Retire the cached cluster tiles containing any of the points"""
+    _bump_tile_versions(CLUSTER_LAYER, points, settings.CLUSTER_MAX_ZOOM)
+
+def _tile_path(layer, z, x, y, version):
+    return os.path.join(settings.TILE_CACHE_DIR, layer, str(z), str(x), f'{y}.{version}.mvt')
+
+def _render_vector_tile(layer, z, x, y):
+    config = VECTOR_TILE_LAYERS[layer]
+    model = config['model']
+    qn = connection.ops.quote_name
+    geom = qn(model._meta.get_field(config['geom']).column)
+    columns = ', '.join(
+        f't.{qn(model._meta.get_field(name).column)}' for name in config['attributes']
+    )
+
+    sql = f"""
+        WITH bounds AS (SELECT ST_TileEnvelope(%s, %s, %s) AS geom),
+        features AS (
+            SELECT ST_AsMVTGeom(ST_Transform(t.{geom}, 3857), bounds.geom) AS geom, {columns}
+            FROM {qn(model._meta.db_table)} t, bounds
+            WHERE t.{geom} && ST_Transform(bounds.geom, 4326)
+        )
+        SELECT ST_AsMVT(features.*, %s) FROM features
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, layer])
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile else b''
+
+def get_vector_tile(layer, z, x, y):
+    """Mapbox Vector Tile of a layer, rendered with ST_AsMVT and cached on disk per tile version"""
+    path = _tile_path(layer, z, x, y, tile_version(layer, z, x, y))
+    try:
+        with open(path, 'rb') as tile_file:
+            return tile_file.read()
+    except FileNotFoundError:
+        pass
+
+    tile = _render_vector_tile(layer, z, x, y)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp_file:
+        tmp_file.write(tile)
+    os.replace(tmp_path, path)
+
+    # Older versions of this tile can no longer be served
+    for stale_path in glob.glob(os.path.join(directory, f'{y}.*.mvt')):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+    return tile
+
+def invalidate_point_tiles(layer, point):
+    """Retire the cached vector tiles of a layer containing a point at every zoom level"""
+    invalidate_tiles(layer, [point])
+
+def invalidate_tiles(layer, points):
+    """Retire the cached vector tiles of a layer containing any of the points, on every host"""
+    _bump_tile_versions(layer, points, settings.TILE_MAX_ZOOM)
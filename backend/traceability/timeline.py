@@ -0,0 +1,153 @@
+from django.db import transaction
+from rest_framework import serializers
+from .cache import bump_batch_version
+from .models import TimelineEntry
+
+_date_field = serializers.DateTimeField()
+
+def _location(point):
+    if not point:
+        return None
+    return {'lat': point.y, 'lng': point.x}
+
+def collection_entry(batch):
+    """Timeline entry for the collection of a batch"""
+    return {
+        'date': _date_field.to_representation(batch.collection_date),
+        'type': 'COLLECTION',
+        'title': 'Herb Collection',
+        'description': f'Collected {batch.quantity_kg}kg of {batch.species.name}',
+        'location': _location(batch.collection_location),
+        'actor': batch.collector.user.get_full_name(),
+        'details': {
+            'quantity': str(batch.quantity_kg),
+            'quality_grade': batch.quality_grade,
+            'harvesting_method': batch.harvesting_method
+        }
+    }
+
+def processing_entry(event):
+    """Timeline entry for a processing event"""
+    return {
+        'date': _date_field.to_representation(event.event_date),
+        'type': event.event_type,
+        'title': event.get_event_type_display(),
+        'description': f'{event.event_type.lower().replace("_", " ").title()} at {event.facility_name}',
+        'location': _location(event.location),
+        'actor': event.processor.get_full_name(),
+        'details': {
+            'facility': event.facility_name,
+            'input_quantity': str(event.input_quantity_kg),
+            'output_quantity': str(event.output_quantity_kg) if event.output_quantity_kg else None,
+            'yield_percentage': str(event.yield_percentage) if event.yield_percentage else None
+        }
+    }
+
+def quality_test_entry(test):
+    """Timeline entry for a quality test"""
+    return {
+        'date': _date_field.to_representation(test.test_date),
+        'type': 'QUALITY_TEST',
+        'title': f'{test.get_test_type_display()}',
+        'description': f'Quality test at {test.testing_lab}',
+        'location': None,
+        'actor': test.testing_lab,
+        'details': {
+            'test_type': test.test_type,
+            'pass_status': test.pass_status,
+            'lab': test.testing_lab,
+            'certificate': test.certificate_number
+        }
+    }
+
+def record_collection(batch):
+    TimelineEntry.objects.update_or_create(
+        source_type='COLLECTION',
+        source_id=batch.batch_id,
+        defaults={
+            'batch_id': batch.batch_id,
+            'occurred_at': batch.collection_date,
+            'data': collection_entry(batch),
+        }
+    )
+
+def record_collections(batches):
+    """Collection entries of newly inserted batches, in one insert"""
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(
+            batch_id=batch.batch_id,
+            source_type='COLLECTION',
+            source_id=batch.batch_id,
+            occurred_at=batch.collection_date,
+            data=collection_entry(batch)
+        )
+        for batch in batches
+    ])
+
+def record_processing_event(event):
+    TimelineEntry.objects.update_or_create(
+        source_type='PROCESSING',
+        source_id=str(event.pk),
+        defaults={
+            'batch_id': event.batch_id,
+            'occurred_at': event.event_date,
+            'data': processing_entry(event),
+        }
+    )
+
+def record_quality_test(test):
+    TimelineEntry.objects.update_or_create(
+        source_type='QUALITY_TEST',
+        source_id=str(test.pk),
+        defaults={
+            'batch_id': test.batch_id,
+            'occurred_at': test.test_date,
+            'data': quality_test_entry(test),
+        }
+    )
+
+def remove_entry(source_type, source_id):
+    TimelineEntry.objects.filter(source_type=source_type, source_id=str(source_id)).delete()
+
+def rebuild_timeline(batch):
+    """
+    Rebuild the materialized timeline of a batch from its source records.
+
+    The delete and insert commit together, so readers never see a partial
+    timeline, and the batch version is bumped so cached details re-render.
+    """
+    entries = [
+        TimelineEntry(
+            batch_id=batch.batch_id,
+            source_type='COLLECTION',
+            source_id=batch.batch_id,
+            occurred_at=batch.collection_date,
+            data=collection_entry(batch)
+        )
+    ]
+    for event in batch.processing_events.select_related('processor'):
+        entries.append(TimelineEntry(
+            batch_id=batch.batch_id,
+            source_type='PROCESSING',
+            source_id=str(event.pk),
+            occurred_at=event.event_date,
+            data=processing_entry(event)
+        ))
+    for test in batch.quality_tests.all():
+        entries.append(TimelineEntry(
+            batch_id=batch.batch_id,
+            source_type='QUALITY_TEST',
+            source_id=str(test.pk),
+            occurred_at=test.test_date,
+            data=quality_test_entry(test)
+        ))
+
+    with transaction.atomic():
+        TimelineEntry.objects.filter(batch_id=batch.batch_id).delete()
+        TimelineEntry.objects.bulk_create(entries)
+        bump_batch_version(batch.batch_id)
+    return len(entries)
+
+def get_timeline(batch_id):
+    """Ordered timeline entries of a batch"""
+    return TimelineEntry.objects.filter(batch_id=batch_id).order_by('occurred_at', 'id')
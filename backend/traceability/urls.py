@@ -12,4 +12,6 @@ router.register(r'verifications', views.ConsumerVerificationViewSet)
 
 urlpatterns = [
     path('api/v1/', include(router.urls)),
+    path('api/v1/changes/', views.change_feed, name='change_feed'),
+    path('api/v1/tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', views.vector_tile, name='vector_tile'),
 ]
@@ -0,0 +1,79 @@
+from django.db.models import Count, F, Q
+
+from .models import Batch, ConsumerVerification
+from .cache import get_batch_versions, get_cached_batch_details, batch_etag
+from .tiles import invalidate_point_tiles
+
+VERDICT_FIELDS = ('batch_id', 'status', 'quality_grade', 'is_blockchain_verified')
+
+def _verdict(batch_id, version, row, species, failed_tests):
+    if row is None:
+        return {'batch_id': batch_id, 'verdict': 'NOT_FOUND'}
+    if failed_tests:
+        verdict = 'FAILED_QUALITY'
+    elif row['is_blockchain_verified']:
+        verdict = 'VERIFIED'
+    else:
+        verdict = 'UNVERIFIED'
+    return {
+        'batch_id': batch_id,
+        'verdict': verdict,
+        'status': row['status'],
+        'species': species,
+        'quality_grade': row['quality_grade'],
+        'blockchain_verified': row['is_blockchain_verified'],
+        'failed_quality_tests': failed_tests,
+        'etag': batch_etag(batch_id, version),
+    }
+
+def _verdict_from_payload(batch_id, version, payload):
+    # Detail payloads are GeoJSON Features
+    properties = payload['properties']
+    return _verdict(
+        batch_id, version, properties, properties['species']['name'],
+        properties['quality_tests_summary']['failed']
+    )
+
+def _uncached_rows(batch_ids):
+    """Verdict columns of batches without a cached detail payload, in one query"""
+    if not batch_ids:
+        return {}
+    rows = (
+        Batch.objects.filter(batch_id__in=batch_ids).order_by()
+        .values(*VERDICT_FIELDS, species_name=F('species__name'))
+        .annotate(failed_tests=Count('quality_tests', filter=Q(quality_tests__pass_status=False)))
+    )
+    return {row['batch_id']: row for row in rows}
+
+def verify_batches(batch_ids, consumer_location=None, **recorded):
+    """
+    Compact verdicts for a list of batches, recording one verification each.
+
+    Verdicts come from cached detail payloads where the current version is
+    cached, and from a single query for the rest; verifications of existing
+    batches are written with one bulk_create.
+    """
+    versions = get_batch_versions(batch_ids)
+    cached = get_cached_batch_details(versions)
+    rows = _uncached_rows([batch_id for batch_id in batch_ids if batch_id not in cached])
+
+    results = []
+    for batch_id in batch_ids:
+        if batch_id in cached:
+            results.append(_verdict_from_payload(batch_id, versions[batch_id], cached[batch_id]))
+        else:
+            row = rows.get(batch_id)
+            results.append(_verdict(
+                batch_id, versions[batch_id], row,
+                row and row['species_name'], row and row['failed_tests']
+            ))
+
+    found = [result['batch_id'] for result in results if result['verdict'] != 'NOT_FOUND']
+    ConsumerVerification.objects.bulk_create([
+        ConsumerVerification(batch_id=batch_id, consumer_location=consumer_location, **recorded)
+        for batch_id in found
+    ])
+    # bulk_create skips the post_save handler that refreshes verification tiles
+    if found:
+        invalidate_point_tiles('verifications', consumer_location)
+    return results
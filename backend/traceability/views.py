@@ -1,12 +1,16 @@
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.permissions import BasePermission, IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.gis.geos import Point
-from django.contrib.gis.measure import Distance
 from django.db.models import Count, Sum, Avg, Q
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.conf import settings
+from collections import Counter
 from datetime import datetime, timedelta
 import json
 
@@ -14,26 +18,89 @@ from .models import HerbSpecies, Collector, Batch, ProcessingEvent, QualityTest,
 from .serializers import (
     HerbSpeciesSerializer, CollectorSerializer, CollectorCreateSerializer,
     BatchSerializer, BatchCreateSerializer, BatchDetailSerializer, BatchStatsSerializer,
-    ProcessingEventSerializer, QualityTestSerializer, ConsumerVerificationSerializer
+    ProcessingEventSerializer, QualityTestSerializer, ConsumerVerificationSerializer,
+    BatchAnomalySerializer, BATCH_DETAIL_VERIFICATION_FIELDS, render_verification_fields
 )
+from .cache import get_batch_version, batch_etag, etag_matches, get_batch_detail
+from .singleflight import stats_flight, flight_stats
+from .timeline import get_timeline
+from .pagination import TimelinePagination, BatchEventPagination, BatchTestPagination
+from .tiles import tiles_for_bbox, get_tile_clusters, get_vector_tile, VECTOR_TILE_LAYERS
+from .renderers import VectorTileRenderer
+from .nearby import knn_nearby, parse_limit, decode_cursor
+from .anomalies import detect_batch_anomalies
+from .search import RankedSearchFilter
+from .catalogue import species_catalogue
+from .export import EXPORT_FORMATS, parse_export_options, stream_export, export_filename
+from .bulk import preload_batch_relations, bulk_create_batches
+from .sparse import SparseFieldsetMixin
+from .fastpath import FastListMixin
+from .conditional import ConditionalGetMixin
+from .idempotency import IdempotentCreateMixin, idempotent_response
+from .verification import verify_batches
+from .changes import SYNC_MODELS, ResyncRequired, get_changes, encode_token, decode_token
+from herbtrace.db_routers import ReplicaReadMixin
+from herbtrace.pagination import HybridPagination
 
-class HerbSpeciesViewSet(viewsets.ModelViewSet):
+def nearby_response(view, request, field, lng, lat, radius_km):
+    """Bounded, KNN-ordered nearby search with cursor continuation"""
+    point = Point(lng, lat, srid=4326)
+    cursor = request.query_params.get('cursor')
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+        if cursor:
+            decode_cursor(cursor)
+    except (TypeError, ValueError):
+        return Response({'error': 'Invalid limit or cursor'},
+                      status=status.HTTP_400_BAD_REQUEST)
+    
+    rows, next_cursor = knn_nearby(
+        view.filter_queryset(view.get_queryset()), field, point, radius_km, limit, cursor=cursor
+    )
+    
+    data = view.get_serializer(rows, many=True).data
+    for feature, row in zip(data['features'], rows):
+        feature['properties']['distance_km'] = round(row.distance.km, 3)
+    
+    next_url = None
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+    return Response({'next': next_url, 'results': data})
+
+class HerbSpeciesViewSet(ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = HerbSpecies.objects.all()
     serializer_class = HerbSpeciesSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     search_fields = ['name', 'scientific_name', 'sanskrit_name']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Type-ahead over English, scientific, Sanskrit and common species names"""
+        prefix = request.query_params.get('q', '')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'results': species_catalogue.autocomplete(prefix, limit)})
 
-class CollectorViewSet(viewsets.ModelViewSet):
+class CollectorViewSet(ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Collector.objects.select_related('user').prefetch_related('specializations')
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['certification_level', 'is_verified']
+    # Trigram-indexed ILIKE keeps partial name matches the word-based document misses
     search_fields = ['collector_id', 'user__first_name', 'user__last_name']
+    search_document_field = 'search_document'
     ordering_fields = ['collector_id', 'created_at', 'experience_years']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = HybridPagination
+    sparse_actions = ('list', 'retrieve', 'nearby')
+    replica_actions = ('list', 'nearby')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -51,73 +118,236 @@ class CollectorViewSet(viewsets.ModelViewSet):
             return Response({'error': 'lat and lng parameters required'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        point = Point(float(lng), float(lat), srid=4326)
-        collectors = self.queryset.filter(
-            location__distance_lte=(point, Distance(km=radius_km))
-        ).annotate(
-            distance=Distance('location', point)
-        ).order_by('distance')
-        
-        serializer = self.get_serializer(collectors, many=True)
-        return Response(serializer.data)
+        return nearby_response(self, request, 'location', float(lng), float(lat), radius_km)
 
-class BatchViewSet(viewsets.ModelViewSet):
-    queryset = Batch.objects.select_related('species', 'collector__user').prefetch_related(
+class BatchViewSet(ReplicaReadMixin, ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
+    queryset = Batch.objects.select_related('collector__user').prefetch_related(
         'processing_events', 'quality_tests', 'verifications'
     )
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['status', 'quality_grade', 'harvesting_method', 'species', 'collector']
     search_fields = ['batch_id', 'species__name', 'collector__collector_id']
+    search_document_field = 'search_document'
     ordering_fields = ['batch_id', 'created_at', 'collection_date', 'quantity_kg']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-batch_id']
+    pagination_class = HybridPagination
+    sparse_actions = ('list', 'nearby_collections')
+    # retrieve and verify build payloads cached by batch version, so they read the primary
+    replica_actions = ('list', 'stats', 'nearby_collections')
     
     def get_serializer_class(self):
-        if self.action == 'create':
+        if self.action in ('create', 'bulk'):
             return BatchCreateSerializer
         elif self.action == 'retrieve':
             return BatchDetailSerializer
         return BatchSerializer
     
+    def perform_create(self, serializer):
+        batch = serializer.save()
+        detect_batch_anomalies(batch)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Validate and insert a list of batches, e.g. a collector's offline backlog"""
+        return idempotent_response(request, lambda: self._bulk_create(request))
+    
+    def _bulk_create(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty list of batches'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.BULK_BATCH_MAX_ITEMS:
+            return Response({'error': f'At most {settings.BULK_BATCH_MAX_ITEMS} batches per request'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        context = self.get_serializer_context()
+        context['preloaded'] = preload_batch_relations(items)
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BatchCreateSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+        
+        if valid:
+            batches, anomalies = bulk_create_batches([data for _, data in valid])
+            flags = {}
+            for anomaly in anomalies:
+                flags.setdefault(anomaly.batch_id, []).append(anomaly)
+            for (index, _), batch in zip(valid, batches):
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'batch_id': batch.batch_id,
+                    'anomalies': BatchAnomalySerializer(flags.get(batch.batch_id, []), many=True).data,
+                }
+        
+        if len(valid) == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif valid:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(valid), 'failed': len(items) - len(valid), 'results': results},
+                        status=response_status)
+    
     def get_permissions(self):
         """Allow public access to verify action"""
-        if self.action == 'verify':
+        if self.action in ('verify', 'verify_many'):
             return [AllowAny()]
         return super().get_permissions()
     
+    def _get_detail_payload(self, pk, version):
+        """Cached BatchDetailSerializer payload, rendered once per batch version"""
+        def build():
+            # Shared by retrieve and verify, so not fitted to either request's serializer
+            fields = set(BatchDetailSerializer().fields) - set(BATCH_DETAIL_VERIFICATION_FIELDS)
+            queryset = BatchDetailSerializer(fields=fields).optimize_queryset(self.queryset)
+            return BatchDetailSerializer(get_object_or_404(queryset, pk=pk), fields=fields).data
+        return get_batch_detail(pk, version, build)
+    
+    def _with_verifications(self, pk, payload):
+        """Add the verification fields, which are not versioned with the batch, to a cached payload"""
+        return {**payload, 'properties': {**payload['properties'], **render_verification_fields(pk)}}
+    
+    def _check_detail_permissions(self):
+        """
+        Object permission checks for a detail served from the version cache.
+
+        Any authenticated user may read any batch, and the same payload is
+        public through verify, so the row is only loaded when a permission
+        class actually checks objects. The filter backends narrow lists only.
+        """
+        if any(type(permission).has_object_permission is not BasePermission.has_object_permission
+               for permission in self.get_permissions()):
+            self.get_object()
+    
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        self._check_detail_permissions()
+        version = get_batch_version(pk)
+        etag = batch_etag(pk, version)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        payload = self._with_verifications(pk, self._get_detail_payload(pk, version))
+        return Response(payload, headers={'ETag': etag})
+    
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def verify(self, request, pk=None):
         """Public endpoint for consumer verification"""
-        try:
-            batch = self.get_object()
-            
-            # Record verification event
-            consumer_location = None
-            lat = request.query_params.get('lat')
-            lng = request.query_params.get('lng')
-            if lat and lng:
+        version = get_batch_version(pk)
+        etag = batch_etag(pk, version)
+        not_modified = etag_matches(request, etag)
+        payload = None if not_modified else self._get_detail_payload(pk, version)
+        
+        # Record verification event
+        consumer_location = None
+        lat = request.query_params.get('lat')
+        lng = request.query_params.get('lng')
+        if lat and lng:
+            consumer_location = Point(float(lng), float(lat), srid=4326)
+        
+        ConsumerVerification.objects.create(
+            batch_id=pk,
+            consumer_location=consumer_location,
+            verification_method='BATCH_LOOKUP',
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+        
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(self._with_verifications(pk, payload), headers={'ETag': etag})
+    
+    @action(detail=False, methods=['post'], url_path='verify-many', permission_classes=[AllowAny])
+    def verify_many(self, request):
+        """Public verification of a shipment's batches in one request"""
+        batch_ids = request.data.get('batch_ids') if isinstance(request.data, dict) else None
+        if not isinstance(batch_ids, list) or not batch_ids:
+            return Response({'error': 'Expected a non-empty list of batch_ids'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        batch_ids = list(dict.fromkeys(str(batch_id) for batch_id in batch_ids))
+        if len(batch_ids) > settings.VERIFY_MANY_MAX_ITEMS:
+            return Response({'error': f'At most {settings.VERIFY_MANY_MAX_ITEMS} batches per request'},
+                          status=status.HTTP_400_BAD_REQUEST)
+    
+        method = request.data.get('verification_method', 'QR_SCAN')
+        if method not in dict(ConsumerVerification._meta.get_field('verification_method').choices):
+            return Response({'error': 'Invalid verification_method'}, status=status.HTTP_400_BAD_REQUEST)
+        consumer_location = None
+        lat = request.data.get('lat')
+        lng = request.data.get('lng')
+        if lat is not None and lng is not None:
+            try:
                 consumer_location = Point(float(lng), float(lat), srid=4326)
-            
-            ConsumerVerification.objects.create(
-                batch=batch,
-                consumer_location=consumer_location,
-                verification_method='BATCH_LOOKUP',
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                ip_address=request.META.get('REMOTE_ADDR')
-            )
-            
-            serializer = BatchDetailSerializer(batch)
-            return Response(serializer.data)
-            
-        except Batch.DoesNotExist:
-            return Response({'error': 'Batch not found'}, 
-                          status=status.HTTP_404_NOT_FOUND)
+            except (TypeError, ValueError):
+                return Response({'error': 'Invalid lat/lng'}, status=status.HTTP_400_BAD_REQUEST)
+    
+        results = verify_batches(
+            batch_ids,
+            consumer_location=consumer_location,
+            verification_method=method,
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+        verdicts = Counter(result['verdict'] for result in results)
+        return Response({'count': len(results), 'verdicts': verdicts, 'results': results})
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """Paginated supply chain timeline of a batch"""
+        get_object_or_404(Batch.objects.only('batch_id'), pk=pk)
+        entries = get_timeline(pk).only('id', 'occurred_at', 'data')
+        
+        # Paginated on the timeline's own ordering, not the batch list ordering
+        paginator = TimelinePagination()
+        page = paginator.paginate_queryset(entries, request)
+        return paginator.get_paginated_response([entry.data for entry in page])
+    
+    @action(detail=True, methods=['get'])
+    def events(self, request, pk=None):
+        """Paginated processing events of a batch, oldest first"""
+        return self._history_page(request, pk, ProcessingEvent, ProcessingEventSerializer, BatchEventPagination)
+    
+    @action(detail=True, methods=['get'])
+    def tests(self, request, pk=None):
+        """Paginated quality tests of a batch, oldest first"""
+        return self._history_page(request, pk, QualityTest, QualityTestSerializer, BatchTestPagination)
+    
+    def _history_page(self, request, pk, model, serializer_class, pagination_class):
+        get_object_or_404(Batch.objects.only('batch_id'), pk=pk)
+        context = self.get_serializer_context()
+        paginator = pagination_class()
+        
+        # Keyset pagination on the history's own ordering, over only the columns rendered
+        queryset = serializer_class(context=context).optimize_queryset(
+            model.objects.filter(batch_id=pk), extra_columns=paginator.ordering
+        )
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator.get_paginated_response(serializer_class(page, many=True, context=context).data)
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get batch statistics and analytics"""
         # Date range filter
         days = int(request.query_params.get('days', 30))
+        data = stats_flight.get_or_build(
+            f'batch-stats:{days}',
+            lambda: self._build_stats(days),
+            timeout=settings.STATS_CACHE_TIMEOUT
+        )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def coalescing(self, request):
+        """Single-flight counters for this worker process"""
+        return Response(flight_stats())
+    
+    def _build_stats(self, days):
         start_date = timezone.now() - timedelta(days=days)
         
         queryset = self.queryset.filter(created_at__gte=start_date)
@@ -193,7 +423,52 @@ class BatchViewSet(viewsets.ModelViewSet):
         }
         
         serializer = BatchStatsSerializer(stats_data)
-        return Response(serializer.data)
+        return serializer.data
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream matching batches with their events and tests as NDJSON, CSV or GeoJSON-seq"""
+        try:
+            options = parse_export_options(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        gzip = request.query_params.get('gzip') in ('1', 'true')
+        response = StreamingHttpResponse(
+            stream_export(gzip=gzip, **options),
+            content_type='application/gzip' if gzip else EXPORT_FORMATS[options['output']][0]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(options["output"], gzip)}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """Grid clusters of collection locations for a map viewport"""
+        try:
+            west, south, east, north = [float(v) for v in request.query_params['bbox'].split(',')]
+            zoom = int(request.query_params['zoom'])
+        except (KeyError, ValueError):
+            return Response({'error': 'bbox (west,south,east,north) and zoom parameters required'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        if not 0 <= zoom <= settings.CLUSTER_MAX_ZOOM:
+            return Response({'error': f'zoom must be between 0 and {settings.CLUSTER_MAX_ZOOM}'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        tiles = tiles_for_bbox(west, south, east, north, zoom)
+        if len(tiles) > settings.CLUSTER_MAX_TILES:
+            return Response({'error': 'bbox covers too many tiles for this zoom level'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        features = []
+        for x, y in tiles:
+            features.extend(get_tile_clusters(zoom, x, y))
+        
+        return Response({
+            'type': 'FeatureCollection',
+            'zoom': zoom,
+            'features': features
+        })
     
     @action(detail=False, methods=['get'])
     def nearby_collections(self, request):
@@ -206,17 +481,9 @@ class BatchViewSet(viewsets.ModelViewSet):
             return Response({'error': 'lat and lng parameters required'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        point = Point(float(lng), float(lat), srid=4326)
-        batches = self.queryset.filter(
-            collection_location__distance_lte=(point, Distance(km=radius_km))
-        ).annotate(
-            distance=Distance('collection_location', point)
-        ).order_by('distance')
-        
-        serializer = self.get_serializer(batches, many=True)
-        return Response(serializer.data)
+        return nearby_response(self, request, 'collection_location', float(lng), float(lat), radius_km)
 
-class ProcessingEventViewSet(viewsets.ModelViewSet):
+class ProcessingEventViewSet(ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = ProcessingEvent.objects.select_related('batch', 'processor')
     serializer_class = ProcessingEventSerializer
     permission_classes = [IsAuthenticated]
@@ -224,9 +491,10 @@ class ProcessingEventViewSet(viewsets.ModelViewSet):
     filterset_fields = ['event_type', 'batch', 'processor']
     search_fields = ['batch__batch_id', 'facility_name', 'processor__username']
     ordering_fields = ['event_date', 'created_at']
-    ordering = ['-event_date']
+    ordering = ['-event_date', '-id']
+    pagination_class = HybridPagination
 
-class QualityTestViewSet(viewsets.ModelViewSet):
+class QualityTestViewSet(ReplicaReadMixin, SparseFieldsetMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = QualityTest.objects.select_related('batch')
     serializer_class = QualityTestSerializer
     permission_classes = [IsAuthenticated]
@@ -234,16 +502,19 @@ class QualityTestViewSet(viewsets.ModelViewSet):
     filterset_fields = ['test_type', 'pass_status', 'batch']
     search_fields = ['batch__batch_id', 'testing_lab', 'certificate_number']
     ordering_fields = ['test_date', 'created_at']
-    ordering = ['-test_date']
+    ordering = ['-test_date', '-id']
+    pagination_class = HybridPagination
 
-class ConsumerVerificationViewSet(viewsets.ReadOnlyModelViewSet):
+class ConsumerVerificationViewSet(ReplicaReadMixin, FastListMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ConsumerVerification.objects.select_related('batch')
     serializer_class = ConsumerVerificationSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['verification_method', 'batch']
     ordering_fields = ['verification_date']
-    ordering = ['-verification_date']
+    ordering = ['-verification_date', '-id']
+    pagination_class = HybridPagination
+    replica_actions = ('list', 'analytics')
     
     @action(detail=False, methods=['get'])
     def analytics(self, request):
@@ -274,3 +545,45 @@ class ConsumerVerificationViewSet(viewsets.ReadOnlyModelViewSet):
             })
         
         return Response(analytics)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([VectorTileRenderer])
+def vector_tile(request, layer, z, x, y):
+    """Mapbox Vector Tile of collection points, collector locations or verifications"""
+    if layer not in VECTOR_TILE_LAYERS or not 0 <= z <= settings.TILE_MAX_ZOOM:
+        raise Http404
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise Http404
+    
+    return Response(get_vector_tile(layer, z, x, y), content_type=VectorTileRenderer.media_type)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def change_feed(request):
+    """Batches, processing events, quality tests and blockchain transactions changed since a sync token"""
+    token = request.query_params.get('since')
+    models = [name for name in request.query_params.get('models', '').split(',') if name]
+    try:
+        since = decode_token(token) if token else None
+        limit = max(1, min(int(request.query_params.get('limit', settings.CHANGE_FEED_DEFAULT_LIMIT)),
+                           settings.CHANGE_FEED_MAX_LIMIT))
+    except ValueError:
+        return Response({'error': 'Invalid sync token or limit'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    unknown = set(models) - set(SYNC_MODELS)
+    if unknown:
+        return Response({'error': f'Unknown models: {", ".join(sorted(unknown))}'},
+                      status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        changes, last_seq, has_more = get_changes(since, limit, models)
+    except ResyncRequired:
+        return Response({'error': 'Sync token has expired, fetch a full snapshot and sync again'},
+                      status=status.HTTP_410_GONE)
+    
+    return Response({
+        'changes': changes,
+        'next_token': encode_token(last_seq),
+        'has_more': has_more,
+    })
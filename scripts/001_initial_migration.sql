@@ -4,6 +4,9 @@
 -- Enable PostGIS extension
 CREATE EXTENSION IF NOT EXISTS postgis;
 
+-- Enable pg_trgm for the trigram search indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create database user if not exists
 DO
 $do$